@@ -3,13 +3,33 @@
 # DOWNLOAD PLN → XLSX → GABUNG SEMUA SHEET → OUTPUT 1 XLSX
 # DENGAN PILIHAN SERVER (INTRANET / INTERNET)
 # + DROPDOWN "UNIT DATA" (SEMUA / 1 UNIT) DI BAWAH UNITAP
+# + MODE BATCH (TANPA GUI): BLTH x UNITAP x UP
+#
+# GUI   : python "0 - Fix - Data Cust ACMT DLPD - UX - New.py"
+# BATCH : python "0 - Fix - Data Cust ACMT DLPD - UX - New.py" \
+#             --blth 202510-202512 --unitap ALL --server INTRANET --format CSV
 # ==========================================================
 
+import io
 import os
+import sys
 import time
-import tempfile
+import json
+import shutil
+import queue
+import pickle
+import random
+import hashlib
+import csv
+import argparse
 import threading
+import importlib.util
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox
@@ -17,7 +37,53 @@ from urllib3.exceptions import InsecureRequestWarning
 
 # ===================== KONFIG =====================
 MAX_RETRY = 3
-RETRY_DELAY = 5
+RETRY_DELAY = 5        # jeda awal (detik), naik eksponensial + jitter
+RETRY_MAX_DELAY = 60   # jeda maksimal antar retry
+CB_THRESHOLD = 5       # gagal beruntun sebelum server "diistirahatkan"
+CB_COOLDOWN = 60       # lama istirahat (detik) sebelum 1 request percobaan
+CB_TRIAL_TIMEOUT = 300 # request percobaan tanpa hasil selama ini -> boleh percobaan baru
+
+# Mode server AUTO: probe latency, pilih server tercepat, failover jika gagal.
+# Hedging (opsional): kirim request duplikat ke server lain jika request pertama
+# lebih lama dari persentil HEDGE_PERCENTILE durasi UP sebelumnya.
+HEDGE_PERCENTILE = 0.90
+HEDGE_MIN_SAMPLES = 5
+HEDGE_DEFAULT_DELAY = 90   # detik, dipakai sebelum sampel cukup
+PROBE_INTERVAL = 300       # detik; probe latency diulang agar RTT antar server tetap sebanding
+
+# Fan-out: 1 UP diminta sebagai beberapa report kecil (paralel), lalu digabung + dedup.
+# "JN"  : per rentang jam nyala (jnf/jnt); batas antar slice overlap 1 nilai -> dedup
+# "RBM" : per kode RBM dari RBM_DICT[UP] (jika kosong, fallback ke JN)
+SPLIT_MODES = ["NONE", "JN", "RBM"]
+JN_BATAS = [0, 40, 60, 100, 150, 250, 400, 720, 99999999999]
+RBM_DICT = {}   # contoh: {"32320": ["A1", "A2", "B1"]}
+SPLIT_WORKERS = 4
+
+MAX_LOG_LINES = 5000   # baris log yang disimpan di GUI (lebih lama dibuang)
+MAX_WORKERS = 3      # jumlah UP yang diunduh paralel (global, semua BLTH/UNITAP)
+PER_SERVER_LIMIT = 4 # maksimal request bersamaan ke 1 server BIRT
+
+# Engine pembaca xlsx: "auto" = calamine (cepat) jika tersedia, fallback openpyxl
+# pip install python-calamine   (butuh pandas >= 2.2)
+EXCEL_ENGINE = "auto"
+
+# Kolom yang dibaca dari report (kosong = semua kolom).
+# Nama dicocokkan case-insensitive; kolom yang tidak ada di sheet diabaikan.
+KOLOM_DIPERLUKAN = []
+
+# Format output gabungan (ditulis bertahap per UP, tidak di-concat di memory)
+# XLSX butuh xlsxwriter (fallback openpyxl write-only), PARQUET butuh pyarrow
+OUTPUT_FORMATS = ["XLSX", "CSV", "PARQUET"]
+XLSX_MAX_ROWS = 1_048_576   # batas baris per sheet Excel (termasuk header)
+
+# Cache report hasil parse (per server/UP/BLTH/parameter report)
+# BLTH lampau = permanen, BLTH berjalan = kadaluarsa setelah CACHE_TTL_BLTH_BERJALAN
+CACHE_DIR = "0_cache_dlpd"
+CACHE_TTL_BLTH_BERJALAN = 6 * 3600   # detik
+CACHE_MAX_MB = 2048                  # lewat batas -> hapus entry paling lama tidak dipakai
+
+# Checkpoint per UP (untuk resume jika app crash / VPN putus di tengah run)
+CHECKPOINT_DIR = "0_checkpoint_dlpd"
 
 UNITAP_DICT = {
     "32AMU": ["32010", "32020", "32030", "32040"],
@@ -32,128 +98,1061 @@ UNITAP_DICT = {
     "32CMJ": ["32910", "32920", "32930", "32940", "32950", "32960"],
 }
 
+SERVERS = {
+    "INTRANET": "https://ap2t.pln.co.id",
+    "INTERNET": "https://portalapp.iconpln.co.id",
+}
+
 urllib3.disable_warnings(InsecureRequestWarning)
 
+REPORT_DEFAULT = {"rbm": "TOTAL", "jnf": 0, "jnt": 99999999999}
+
 URL_TEMPLATE = (
     "{base}/birt-acmt/run?"
     "__report=rpt_icmo_DataDetail.rptdesign"
     "&up={up}&blth={blth}"
-    "&rbm=TOTAL&jns=FG_DLPD_JAMNYALA"
-    "&tglbaca=&jnf=0&jnt=99999999999"
+    "&rbm={rbm}&jns=FG_DLPD_JAMNYALA"
+    "&tglbaca=&jnf={jnf}&jnt={jnt}"
     "&kdbaca=&kdklpk=&dlpd=4&ptgs="
     "&__format=xlsx"
 )
 
-# ===================== GUI =====================
-root = tk.Tk()
-root.title("Downloader PLN - XLSX Merge Sheets")
-root.geometry("760x650")
-
-# -------- SERVER --------
-tk.Label(root, text="Server", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 0))
-server_var = tk.StringVar(value="INTRANET")
-
-frame_server = tk.Frame(root)
-frame_server.pack(anchor="w", padx=20)
-
-tk.Radiobutton(frame_server, text="INTRANET (ap2t.pln.co.id)",
-               variable=server_var, value="INTRANET").pack(anchor="w")
-
-tk.Radiobutton(frame_server, text="INTERNET (portalapp.iconpln.co.id)",
-               variable=server_var, value="INTERNET").pack(anchor="w")
-
-# -------- INPUT --------
-frame_input = tk.Frame(root)
-frame_input.pack(fill="x", padx=10, pady=10)
-
-tk.Label(frame_input, text="BLTH (YYYYMM)").grid(row=0, column=0, sticky="w")
-blth_entry = ttk.Entry(frame_input, width=12)
-blth_entry.grid(row=0, column=1, padx=5)
-blth_entry.insert(0, "202512")
-
-tk.Label(frame_input, text="UNITAP").grid(row=1, column=0, sticky="w")
-unitap_var = tk.StringVar()
-unitap_combo = ttk.Combobox(
-    frame_input,
-    textvariable=unitap_var,
-    values=list(UNITAP_DICT.keys()),
-    state="readonly",
-    width=15
-)
-unitap_combo.grid(row=1, column=1, padx=5)
-unitap_combo.current(0)
-
-# -------- DROPDOWN UNIT DATA (DI BAWAH UNITAP) --------
-tk.Label(frame_input, text="UNITUP").grid(row=2, column=0, sticky="w")
-unitdata_var = tk.StringVar()
-
-unitdata_combo = ttk.Combobox(
-    frame_input,
-    textvariable=unitdata_var,
-    state="readonly",
-    width=15
-)
-unitdata_combo.grid(row=2, column=1, padx=5)
+# ===================== LOG =====================
+# Default ke stdout (mode CLI); run_gui() mengganti dengan UiPump (thread-safe).
+_log_handler = print
+_progress_handler = None
+
 
-def refresh_unitdata_options(*args):
-    unitap = unitap_var.get().strip()
-    units = UNITAP_DICT.get(unitap, [])
-    unitdata_combo["values"] = ["SEMUA"] + units
-    unitdata_combo.current(0)  # default SEMUA
+def log(msg: str):
+    _log_handler(msg)
 
-unitap_combo.bind("<<ComboboxSelected>>", refresh_unitdata_options)
-refresh_unitdata_options()
 
-# -------- LOG --------
-tk.Label(root, text="Log Proses", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10)
-log_box = tk.Text(root, height=20)
-log_box.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+def progress(**info):
+    """Event progress dari core (nbytes / up_total / up_done + rows) untuk GUI."""
+    if _progress_handler is not None:
+        _progress_handler(info)
+
+
+# ===================== READER XLSX =====================
+@lru_cache(maxsize=None)
+def pilih_excel_engines():
+    """Urutan engine yang dicoba untuk membaca xlsx."""
+    if EXCEL_ENGINE != "auto":
+        return (EXCEL_ENGINE,) if EXCEL_ENGINE == "openpyxl" else (EXCEL_ENGINE, "openpyxl")
+
+    pandas_ver = tuple(int(x) for x in pd.__version__.split(".")[:2])
+    if pandas_ver >= (2, 2) and importlib.util.find_spec("python_calamine"):
+        return ("calamine", "openpyxl")
+    return ("openpyxl",)
+
+
+def baca_xlsx(data):
+    """
+    Baca semua sheet xlsx langsung dari memory (tanpa file temporary).
+    Return (dict sheet -> DataFrame, nama engine yang dipakai).
+    """
+    usecols = None
+    if KOLOM_DIPERLUKAN:
+        wanted = {str(c).strip().upper() for c in KOLOM_DIPERLUKAN}
+        usecols = lambda c: str(c).strip().upper() in wanted
+
+    last_err = None
+    for engine in pilih_excel_engines():
+        try:
+            sheets = pd.read_excel(io.BytesIO(data), sheet_name=None, engine=engine, usecols=usecols)
+            return sheets, engine
+        except Exception as e:
+            last_err = e
+    raise last_err
+
+
+# ===================== WRITER OUTPUT =====================
+class MergedWriter:
+    """
+    Tulis hasil gabungan secara bertahap: tiap UP langsung di-append ke file
+    begitu selesai, jadi tidak ada pd.concat / DataFrame besar di memory.
+    Kolom = gabungan semua frame (seperti pd.concat): kolom yang baru muncul
+    ditambahkan di kanan, baris yang sudah ditulis diisi kosong (lihat
+    _kolom_baru tiap format). File ditulis ke .part lalu di-rename saat tutup().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.columns = None
+        self.rows = 0
+
+    def tulis(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self._buka(df)
+        else:
+            extra = [c for c in df.columns if c not in self.columns]
+            if extra:
+                log(f"  ⚠ Kolom baru (tidak ada di sheet sebelumnya): {', '.join(map(str, extra))}")
+                self.columns += extra
+                self._kolom_baru(df, extra)
+            df = df.reindex(columns=self.columns)
+        self._tulis(df)
+        self.rows += len(df)
+
+    def tutup(self):
+        if self.columns is None:
+            return False
+        self._tutup()
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def _buka(self, df):
+        raise NotImplementedError
+
+    def _tulis(self, df):
+        raise NotImplementedError
+
+    def _kolom_baru(self, df, extra):
+        raise NotImplementedError
+
+    def _tutup(self):
+        pass
+
+
+class CsvWriter(MergedWriter):
+    def _buka(self, df):
+        self.f = open(self.tmp_path, "w", encoding="utf-8", newline="")
+        # header lewat writer yang sama dengan baris data (quoting + line ending sama)
+        pd.DataFrame(columns=self.columns).to_csv(self.f, index=False)
+        self.lebar_berubah = False
+
+    def _tulis(self, df):
+        df.to_csv(self.f, header=False, index=False)
+
+    def _kolom_baru(self, df, extra):
+        self.lebar_berubah = True   # header + baris lama dilebarkan saat tutup()
+
+    def _tutup(self):
+        self.f.close()
+        if not self.lebar_berubah:
+            return
+        # 1x tulis ulang streaming: header gabungan, baris lama diberi sel kosong
+        lebar = len(self.columns)
+        tmp = self.tmp_path + ".lebar"
+        with open(self.tmp_path, "r", encoding="utf-8", newline="") as src, \
+                open(tmp, "w", encoding="utf-8", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator=os.linesep)
+            next(reader, None)
+            writer.writerow([str(c) for c in self.columns])
+            for row in reader:
+                writer.writerow(row + [""] * (lebar - len(row)))
+        os.replace(tmp, self.tmp_path)
+
+
+class ParquetWriter(MergedWriter):
+    """
+    UNITAP/UP (categorical) disimpan dictionary-encoded. Kolom lain disimpan
+    sebagai string (seperti CSV): tipe hasil read_excel bisa beda antar sheet/UP
+    (mis. IDPEL int vs str, kolom kosong = float), sedangkan schema Parquet
+    harus tetap sama untuk seluruh file.
+    """
+
+    def _buka(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.schema = pa.schema([self._field(df, c) for c in self.columns])
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression="zstd")
+
+    def _field(self, df, c):
+        pa = self.pa
+        return pa.field(str(c), pa.dictionary(pa.int32(), pa.string())
+                        if isinstance(df[c].dtype, pd.CategoricalDtype) else pa.string())
+
+    def _kolom_baru(self, df, extra):
+        # schema Parquet tetap per file: salin row group lama (streaming) ke file
+        # baru dengan kolom tambahan berisi null
+        pa, pq = self.pa, self.pq
+        self.writer.close()
+        lama = self.tmp_path + ".lama"
+        os.replace(self.tmp_path, lama)
+        fields = [self._field(df, c) for c in extra]
+        self.schema = pa.schema(list(self.schema) + fields)
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression="zstd")
+        src = pq.ParquetFile(lama)
+        try:
+            for i in range(src.num_row_groups):
+                table = src.read_row_group(i)
+                for field in fields:
+                    table = table.append_column(field, pa.nulls(len(table), type=field.type))
+                self.writer.write_table(table)
+        finally:
+            src.close()
+            os.remove(lama)
+
+    def _tulis(self, df):
+        pa = self.pa
+        arrays = []
+        for c, field in zip(self.columns, self.schema):
+            col = df[c]
+            if pa.types.is_dictionary(field.type):
+                cat = col.astype("category").cat
+                codes = cat.codes.to_numpy().astype("int32")
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, mask=codes < 0),
+                    pa.array([str(v) for v in cat.categories], type=pa.string()),
+                ))
+            else:
+                values = col.astype(object).where(col.notna(), None)
+                arrays.append(pa.array(
+                    [None if v is None else str(v) for v in values], type=pa.string()
+                ))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def _tutup(self):
+        self.writer.close()
+
+
+class XlsxWriter(MergedWriter):
+    """
+    Mode constant-memory: baris langsung di-flush ke disk (xlsxwriter),
+    fallback openpyxl write-only. Sheet baru otomatis jika > XLSX_MAX_ROWS,
+    atau jika ada kolom baru (header yang sudah di-flush tidak bisa diubah).
+    """
+
+    def _buka(self, df):
+        try:
+            import xlsxwriter
+            self.wb = xlsxwriter.Workbook(
+                self.tmp_path,
+                {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"},
+            )
+            self.engine = "xlsxwriter"
+        except ImportError:
+            from openpyxl import Workbook
+            self.wb = Workbook(write_only=True)
+            self.engine = "openpyxl"
+        self.n_sheet = 0
+        self._sheet_baru()
+
+    def _sheet_baru(self):
+        self.n_sheet += 1
+        name = "Sheet1" if self.n_sheet == 1 else f"Sheet{self.n_sheet}"
+        header = [str(c) for c in self.columns]
+        if self.engine == "xlsxwriter":
+            self.ws = self.wb.add_worksheet(name)
+            self.ws.write_row(0, 0, header)
+        else:
+            self.ws = self.wb.create_sheet(name)
+            self.ws.append(header)
+        self.sheet_row = 1
+
+    def _tulis(self, df):
+        # NaN/NaT -> sel kosong
+        data = df.astype(object).where(df.notna(), None)
+        for row in data.itertuples(index=False, name=None):
+            if self.sheet_row >= XLSX_MAX_ROWS:
+                self._sheet_baru()
+            if self.engine == "xlsxwriter":
+                self.ws.write_row(self.sheet_row, 0, row)
+            else:
+                self.ws.append(list(row))
+            self.sheet_row += 1
+
+    def _kolom_baru(self, df, extra):
+        self._sheet_baru()
+        log(f"  ⚠ Lanjut di Sheet{self.n_sheet} dengan header lengkap ({len(self.columns)} kolom)")
+
+    def _tutup(self):
+        if self.engine == "xlsxwriter":
+            self.wb.close()
+        else:
+            self.wb.save(self.tmp_path)
+
+
+WRITERS = {
+    "XLSX": (XlsxWriter, ".xlsx"),
+    "CSV": (CsvWriter, ".csv"),
+    "PARQUET": (ParquetWriter, ".parquet"),
+}
+
+
+# ===================== RETRY POLICY =====================
+class FatalError(Exception):
+    """Error yang tidak akan berubah walau di-retry (4xx, halaman login, dll)."""
+
+
+class RetryableError(Exception):
+    """Error sementara (5xx, 429, ...); retry_after dari header Retry-After jika ada."""
+
+    def __init__(self, msg, retry_after=None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Server sedang diistirahatkan oleh circuit breaker."""
+
+
+class HedgeCancelled(Exception):
+    """Request duplikat (hedging) yang kalah cepat dan dihentikan."""
+
+
+class RetryPolicy:
+    """Exponential backoff + jitter; status HTTP dipilah retryable vs fatal."""
+
+    RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+    def __init__(self, max_retry: int = MAX_RETRY, base_delay: float = RETRY_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        self.max_retry = max(1, max_retry)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        d = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        d = d / 2 + random.uniform(0, d / 2)
+        if retry_after:
+            d = max(d, min(retry_after, self.max_delay))
+        return d
+
+    def cek_status(self, status: int, retry_after: str = None):
+        if status == 200:
+            return
+        if status in self.RETRYABLE_STATUS or status >= 500:
+            try:
+                retry_after = float(retry_after)
+            except (TypeError, ValueError):
+                retry_after = None
+            raise RetryableError(f"HTTP {status}", retry_after)
+        raise FatalError(f"HTTP {status}")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per host: setelah CB_THRESHOLD gagal beruntun, host tidak
+    di-request selama CB_COOLDOWN detik, lalu 1 request percobaan (half-open).
+    Percobaan yang dibatalkan (batal) atau tidak selesai dalam CB_TRIAL_TIMEOUT
+    detik tidak mengunci breaker di half-open.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, host: str, threshold: int = CB_THRESHOLD, cooldown: float = CB_COOLDOWN,
+                 trial_timeout: float = CB_TRIAL_TIMEOUT):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trial_timeout = trial_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def untuk(cls, host: str):
+        with cls._registry_lock:
+            if host not in cls._registry:
+                cls._registry[host] = cls(host)
+            return cls._registry[host]
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.cooldown:
+                self.state = "half_open"   # request ini jadi percobaan
+                self.trial_at = now
+                return True
+            if self.state == "half_open" and now - self.trial_at >= self.trial_timeout:
+                self.trial_at = now        # percobaan sebelumnya tidak pernah selesai
+                return True
+            return False
+
+    def batal(self):
+        """Request selesai tanpa hasil (mis. kalah hedging): lepas jatah percobaan half-open."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.cooldown   # langsung boleh percobaan baru
+
+    def sisa(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def sukses(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def gagal(self) -> bool:
+        """Catat kegagalan. Return True jika breaker baru saja terbuka."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
 
-def log(msg: str):
-    log_box.insert(tk.END, msg + "\n")
-    log_box.see(tk.END)
-    root.update_idletasks()
 
 # ===================== CORE =====================
-def proses_download():
-    log_box.delete("1.0", tk.END)
+CKPT = "CKPT"   # penanda: data UP dibaca dari checkpoint saat ditulis
+
+class ServerLimiter:
+    """Batasi jumlah request bersamaan per server (host BIRT)."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def slot(self, base_url: str):
+        with self._lock:
+            if base_url not in self._slots:
+                self._slots[base_url] = threading.BoundedSemaphore(self.limit)
+            return self._slots[base_url]
+
+
+class ReportCache:
+    """
+    Cache lokal hasil parse report BIRT (dict sheet -> DataFrame, pickle).
+    Key = URL lengkap (server + UP + BLTH + parameter report).
+    Eviction LRU berdasarkan mtime (di-touch setiap kali dipakai).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_mb: int = CACHE_MAX_MB,
+                 ttl_berjalan: int = CACHE_TTL_BLTH_BERJALAN, force_refresh: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.ttl_berjalan = ttl_berjalan
+        self.force_refresh = force_refresh
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".pkl")
+
+    def get(self, url: str, blth: str):
+        if self.force_refresh:
+            return None
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            return None
+
+        if blth >= datetime.now().strftime("%Y%m") and time.time() - entry["saved_at"] > self.ttl_berjalan:
+            return None
+
+        try:
+            os.utime(path, None)   # tandai baru dipakai (LRU)
+        except OSError:
+            pass
+        return entry["sheets"]
+
+    def put(self, url: str, sheets):
+        path = self._path(url)
+        tmp = f"{path}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            pickle.dump({"saved_at": time.time(), "sheets": sheets}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+
+class RunCheckpoint:
+    """
+    Checkpoint hasil per UP + manifest run untuk 1 UNITAP/BLTH.
+    Folder: CHECKPOINT_DIR/{UNITAP}_{BLTH}/{UP}.pkl + manifest.json
+    Run ulang dengan UNITAP/BLTH yang sama hanya mengunduh UP yang belum selesai.
+    Folder dihapus setelah file output lengkap (semua UP ok) berhasil ditulis,
+    jadi run berikutnya kembali ambil data dari server / cache (TTL tetap berlaku).
+    """
+
+    def __init__(self, unitap: str, blth: str, root: str = CHECKPOINT_DIR, reset: bool = False):
+        self.dir = os.path.join(root, f"{unitap}_{blth}")
+        if reset:
+            shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        self._lock = threading.Lock()
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {
+                "unitap": unitap,
+                "blth": blth,
+                "dibuat": datetime.now().isoformat(timespec="seconds"),
+                "ups": {},
+            }
+
+    def _path(self, up: str) -> str:
+        return os.path.join(self.dir, f"{up}.pkl")
+
+    def selesai(self, up: str) -> bool:
+        entry = self.manifest["ups"].get(up, {})
+        return entry.get("status") == "ok" and os.path.exists(self._path(up))
+
+    def simpan(self, up: str, dfs, server: str = ""):
+        path = self._path(up)
+        with open(path + ".part", "wb") as f:
+            pickle.dump(dfs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".part", path)
+        self._update(up, {
+            "status": "ok",
+            "rows": sum(len(df) for df in dfs),
+            "sheets": len(dfs),
+            "server": server,
+            "waktu": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def gagal(self, up: str):
+        self._update(up, {
+            "status": "gagal",
+            "waktu": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def muat(self, up: str):
+        with open(self._path(up), "rb") as f:
+            return pickle.load(f)
+
+    def hapus(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _update(self, up: str, entry: dict):
+        with self._lock:
+            self.manifest["ups"][up] = entry
+            tmp = self.manifest_path + ".part"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(tmp, self.manifest_path)
+
+
+class ServerSelector:
+    """
+    Pilih server BIRT per percobaan: 1 server (INTRANET/INTERNET) atau AUTO.
+    AUTO: server dibandingkan dengan ukuran yang sama: laju download (EWMA
+    byte/dtk) jika semua kandidat sudah punya, selain itu RTT probe (diulang
+    tiap PROBE_INTERVAL). Server yang baru gagal / circuit open ditaruh paling
+    belakang (failover).
+    """
+
+    def __init__(self, bases, hedge: bool = False):
+        self.bases = list(bases)
+        self.hedge = hedge and len(self.bases) > 1
+        self.rtt = {b: None for b in self.bases}    # detik, dari probe
+        self.laju = {b: None for b in self.bases}   # byte/dtk, EWMA download report
+        self.penalti = {b: 0.0 for b in self.bases}
+        self.durasi = deque(maxlen=100)
+        self._http = None
+        self._probe_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def auto(self) -> bool:
+        return len(self.bases) > 1
+
+    def probe(self, http):
+        """Ukur RTT tiap server (paralel, timeout pendek); diulang otomatis dari urutan()."""
+        self._http = http
+        self._probe_at = time.monotonic()
+        def ukur(base):
+            t0 = time.perf_counter()
+            try:
+                r = http.request("GET", f"{base}/birt-acmt/", preload_content=False,
+                                 timeout=urllib3.Timeout(connect=5, read=10), retries=False)
+                r.release_conn()
+                return base, time.perf_counter() - t0
+            except Exception:
+                return base, None
+
+        with ThreadPoolExecutor(max_workers=len(self.bases)) as ex:
+            for base, lat in ex.map(ukur, self.bases):
+                host = urllib3.util.parse_url(base).host
+                if lat is None:
+                    self.penalti[base] = time.monotonic() + CB_COOLDOWN
+                    log(f"PROBE     : {host} tidak merespon")
+                else:
+                    self.rtt[base] = lat
+                    log(f"PROBE     : {host} {lat * 1000:.0f} ms")
+        self._probing = False
+
+    def _probe_ulang(self):
+        with self._lock:
+            if (self._http is None or self._probing
+                    or time.monotonic() - self._probe_at < PROBE_INTERVAL):
+                return
+            self._probing = True
+        threading.Thread(target=self.probe, args=(self._http,), daemon=True).start()
+
+    def sehat(self, base: str) -> bool:
+        # sisa() == 0 setelah cooldown habis walau state masih "open" (state baru
+        # berubah di allow()), jadi server yang pulih bisa terpilih lagi
+        host = urllib3.util.parse_url(base).host
+        return self.penalti[base] <= time.monotonic() and CircuitBreaker.untuk(host).sisa() == 0
+
+    def urutan(self):
+        self._probe_ulang()
+        with self._lock:
+            sehat = {b: self.sehat(b) for b in self.bases}
+            kandidat = [b for b in self.bases if sehat[b]] or self.bases
+            pakai_laju = all(self.laju[b] is not None for b in kandidat)
+
+            def key(b):
+                if pakai_laju:
+                    laju = self.laju[b]
+                    return (not sehat[b], float("inf") if laju is None else -laju)
+                rtt = self.rtt[b]
+                return (not sehat[b], float("inf") if rtt is None else rtt)
+            return sorted(self.bases, key=key)
+
+    def sukses(self, base: str, durasi: float, nbytes: int = 0):
+        with self._lock:
+            if nbytes and durasi > 0:
+                laju = nbytes / durasi
+                lama = self.laju[base]
+                self.laju[base] = laju if lama is None else 0.7 * lama + 0.3 * laju
+            self.penalti[base] = 0.0
+            self.durasi.append(durasi)
+
+    def gagal(self, base: str):
+        with self._lock:
+            self.penalti[base] = time.monotonic() + CB_COOLDOWN
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            data = sorted(self.durasi)
+        if len(data) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return data[min(len(data) - 1, int(len(data) * HEDGE_PERCENTILE))]
+
 
-    blth = blth_entry.get().strip()
-    unitap = unitap_var.get().strip()
+def rencana_slice(up: str, split: str = "NONE"):
+    """Daftar parameter report per slice untuk 1 UP ([{}] = 1 request TOTAL)."""
+    if split == "RBM" and RBM_DICT.get(up):
+        return [{"rbm": rbm} for rbm in RBM_DICT[up]]
+    if split in ("JN", "RBM"):
+        return [{"jnf": a, "jnt": b} for a, b in zip(JN_BATAS, JN_BATAS[1:])]
+    return [{}]
 
-    units_all = UNITAP_DICT.get(unitap, [])
-    unit_selected = unitdata_var.get().strip()
 
-    # ---- TENTUKAN LIST UNIT YANG DIPROSES ----
-    if not units_all:
-        messagebox.showerror("Error", f"Daftar UNIT untuk UNITAP {unitap} kosong / tidak ditemukan.")
-        return
+def gabung_slices(list_sheets):
+    """Gabung semua sheet dari semua slice jadi 1 frame + buang baris duplikat."""
+    frames = [df for sheets in list_sheets for df in sheets.values()]
+    merged = pd.concat(frames, ignore_index=True)
+    n_awal = len(merged)
+    merged = merged.drop_duplicates(ignore_index=True)
+    return {"gabungan": merged}, n_awal - len(merged)
 
-    if unit_selected and unit_selected != "SEMUA":
-        ups = [unit_selected]   # hanya 1 unit
-        output_file = f"DLPD_ACMT_{unitap}_{blth}_{unit_selected}.xlsx"
+
+def download_up(http, selector: ServerSelector, unitap: str, up: str, blth: str,
+                limiter=None, cache=None, split: str = "NONE", split_verify: bool = False):
+    """
+    Unduh + baca 1 UP (dengan retry/failover), atau ambil dari cache jika ada.
+    split != NONE: UP dipecah jadi beberapa slice paralel lalu digabung + dedup;
+    split_verify: ikut minta TOTAL untuk cek jumlah baris hasil gabungan.
+    Return (list DataFrame 1 per sheet, base_url server); list kosong jika gagal total.
+    Dipanggil dari thread pool, jadi semua log diberi prefix [UP BLTH].
+    """
+    t_start = time.perf_counter()
+    tag = f"{up} {blth}"
+    slices = rencana_slice(up, split)
+    unduh = []   # byte per response yang diunduh (slice paralel; list.append thread-safe)
+
+    def ambil(params, slice_tag):
+        report = dict(REPORT_DEFAULT, **params)
+
+        def url_for(base):
+            return URL_TEMPLATE.format(base=base, up=up, blth=blth, **report)
+
+        if cache is not None:
+            for b in selector.bases:
+                sheets = cache.get(url_for(b), blth)
+                if sheets is not None:
+                    return sheets, b, "cache"
+
+        sheets, base = _fetch_sheets(http, selector, url_for, slice_tag, limiter=limiter,
+                                     on_bytes=unduh.append)
+        if sheets is not None and cache is not None:
+            try:
+                cache.put(url_for(base), sheets)
+            except Exception as e:
+                log(f"  ⚠ [{slice_tag}] Gagal simpan cache: {e}")
+        return sheets, base, "server"
+
+    if len(slices) == 1:
+        sheets, base, sumber = ambil(slices[0], tag)
+        if sheets is None:
+            log(f"  ✖ [{tag}] GAGAL ({time.perf_counter() - t_start:.1f} dtk)")
+            return [], None
     else:
-        ups = units_all         # semua unit
-        output_file = f"DLPD_ACMT_{unitap}_{blth}_ALL.xlsx"
+        sheets, base, sumber = _ambil_slices(ambil, slices, tag, split_verify)
+        if sheets is None:
+            log(f"  ✖ [{tag}] GAGAL ({time.perf_counter() - t_start:.1f} dtk)")
+            return [], None
 
-    base_url = (
-        "https://ap2t.pln.co.id"
-        if server_var.get() == "INTRANET"
-        else "https://portalapp.iconpln.co.id"
+    dfs = []
+    total_rows = 0
+    for df in sheets.values():
+        # categorical: 1 string per kolom, bukan jutaan string berulang
+        df["UNITAP"] = pd.Series(unitap, index=df.index, dtype="category")
+        df["UP"] = pd.Series(up, index=df.index, dtype="category")
+        dfs.append(df)
+        total_rows += len(df)
+
+    log(
+        f"  ✔ [{tag}] {len(sheets)} sheet | {total_rows:,} baris | "
+        f"{sumber} {urllib3.util.parse_url(base).host} | {sum(unduh) / 1024 / 1024:.2f} MB | "
+        f"{time.perf_counter() - t_start:.1f} dtk"
     )
+    return dfs, base
+
+
+def _ambil_slices(ambil, slices, tag: str, split_verify: bool = False):
+    """
+    Ambil semua slice 1 UP secara paralel lalu gabung + dedup.
+    Semua slice wajib berhasil (hasil sebagian = data hilang). Return (sheets, base, sumber).
+    """
+    def label(params):
+        if "rbm" in params:
+            return f"rbm {params['rbm']}"
+        return f"jn {params['jnf']}-{params['jnt']}"
+
+    jobs = [(params, f"{tag} {label(params)}") for params in slices]
+    if split_verify:
+        jobs.append(({}, f"{tag} TOTAL"))
+
+    with ThreadPoolExecutor(max_workers=min(SPLIT_WORKERS, len(jobs))) as ex:
+        hasil = list(ex.map(lambda job: ambil(*job), jobs))
+
+    total = hasil.pop() if split_verify else None
+    gagal = [t for (_, t), (sheets, _, _) in zip(jobs, hasil) if sheets is None]
+    if gagal:
+        log(f"  ✖ [{tag}] {len(gagal)}/{len(slices)} slice gagal: {', '.join(gagal)}")
+        return None, None, None
+
+    n_slice = [sum(len(df) for df in sheets.values()) for sheets, _, _ in hasil]
+    sheets, n_dup = gabung_slices([sheets for sheets, _, _ in hasil])
+    n_gabung = len(sheets["gabungan"])
+    log(f"    [{tag}] {len(slices)} slice: {sum(n_slice):,} baris | duplikat dibuang: {n_dup:,} "
+        f"| hasil: {n_gabung:,}")
+    if "rbm" in slices[0] and n_dup:
+        log(f"  ⚠ [{tag}] slice RBM seharusnya tidak overlap, tapi ada {n_dup:,} baris duplikat")
+
+    # ---- cek konsistensi jumlah baris terhadap report TOTAL ----
+    if total is not None and total[0] is not None:
+        n_total = sum(len(df) for df in total[0].values())
+        if n_total == n_gabung:
+            log(f"    [{tag}] cek konsistensi ✔ sama dengan TOTAL ({n_total:,} baris)")
+        else:
+            log(f"  ⚠ [{tag}] cek konsistensi ✖ gabungan {n_gabung:,} vs TOTAL {n_total:,} "
+                f"-> pakai TOTAL")
+            return total
+    elif split_verify:
+        log(f"  ⚠ [{tag}] report TOTAL untuk cek konsistensi gagal diambil")
+
+    sumber = "cache" if all(s == "cache" for _, _, s in hasil) else "server"
+    return sheets, hasil[0][1], sumber
+
+
+def _fetch_sheets(http, selector: ServerSelector, url_for, tag: str,
+                  policy: RetryPolicy = None, limiter=None, on_bytes=None):
+    """
+    Request + parse report BIRT dengan retry. Tiap percobaan memakai server
+    terbaik saat itu (failover otomatis di mode AUTO). Ditolak circuit breaker
+    (belum ada request terkirim) = ditunda, bukan percobaan yang gagal.
+    on_bytes(n) dipanggil untuk tiap response yang selesai diunduh.
+    Return (dict sheet -> DataFrame, base_url) atau (None, None).
+    """
+    policy = policy or RetryPolicy()
+
+    attempt = 0
+    while attempt < policy.max_retry:
+        attempt += 1
+        log(f"  [{tag}] Attempt {attempt}")
+        retry_after = None
+        base = selector.urutan()[0]
+
+        try:
+            t_start = time.perf_counter()
+            data, base = _download_report(http, selector, url_for, tag, policy, limiter)
+            t_download = time.perf_counter() - t_start
+            nbytes = len(data)
+            progress(nbytes=nbytes)
+            if on_bytes is not None:
+                on_bytes(nbytes)
+
+            t_parse = time.perf_counter()
+            sheets, engine = baca_xlsx(data)
+            del data
+            t_parse = time.perf_counter() - t_parse
+            selector.sukses(base, t_download, nbytes)
+
+            total_rows = sum(len(df) for df in sheets.values())
+            log(
+                f"    [{tag}] {urllib3.util.parse_url(base).host}: download "
+                f"{nbytes / 1024 / 1024:.2f} MB | {t_download:.1f} dtk | "
+                f"parse {engine}: {t_parse:.1f} dtk | "
+                f"{total_rows / max(t_parse, 1e-6):,.0f} baris/dtk"
+            )
+            return sheets, base
+
+        except FatalError as e:
+            log(f"  ✖ [{tag}] {e} (tidak di-retry)")
+            return None, None
+
+        except CircuitOpenError as e:
+            attempt -= 1   # tidak dihitung, server juga tidak ditandai gagal
+            base = getattr(e, "base", base)
+            berikut = selector.urutan()[0]
+            host = urllib3.util.parse_url(berikut).host
+            if berikut != base and CircuitBreaker.untuk(host).state == "closed":
+                log(f"  ↪ [{tag}] {e}, failover ke {host}")
+            else:
+                # min. base_delay: saat half-open sisa() = 0 tapi percobaan masih berjalan
+                jeda = max(getattr(e, "retry_after", None) or 0.0, policy.base_delay)
+                log(f"  … [{tag}] {e}, tunggu {jeda:.0f} dtk")
+                time.sleep(jeda)
+            continue
+
+        except RetryableError as e:
+            log(f"  ✖ [{tag}] {e}")
+            base = getattr(e, "base", base)
+            retry_after = getattr(e, "retry_after", None)
+            selector.gagal(base)
+
+        except Exception as e:
+            log(f"  ✖ [{tag}] {e}")
+            selector.gagal(getattr(e, "base", base))
+
+        if attempt < policy.max_retry:
+            berikut = selector.urutan()[0]
+            if berikut != base and selector.sehat(berikut):
+                # failover ke server lain: tidak perlu menunggu
+                log(f"  ↪ [{tag}] failover ke {urllib3.util.parse_url(berikut).host}")
+            else:
+                # tidak menunggu setelah percobaan terakhir
+                time.sleep(policy.delay(attempt, retry_after))
+
+    return None, None
+
 
-    if not base_url.startswith("https://"):
-        messagebox.showerror("Error", "Base URL HARUS https://")
-        return
+def _download_once(http, base: str, url: str, policy: RetryPolicy, limiter=None, cancel=None):
+    """1x request ke 1 server + baca body penuh. Return bytearray."""
+    host = urllib3.util.parse_url(base).host
+    breaker = CircuitBreaker.untuk(host)
+    resp = None
 
-    log(f"SERVER    : {server_var.get()}")
-    log(f"UNITAP    : {unitap}")
-    log(f"UNITUP    : {unit_selected if unit_selected else 'SEMUA'}")
-    log(f"PROSES    : {', '.join(ups)}")   # <- ini yang memastikan SEMUA akan diproses
-    log(f"OUTPUT    : {output_file}")
+    try:
+        with limiter.slot(base) if limiter is not None else nullcontext():
+            if not breaker.allow():
+                e = CircuitOpenError(f"server {host} diistirahatkan ({breaker.sisa():.0f} dtk lagi)")
+                e.retry_after = breaker.sisa()
+                raise e
+
+            resp = http.request("GET", url, preload_content=False)
+            policy.cek_status(resp.status, resp.headers.get("Retry-After"))
+
+            # Halaman HTML (biasanya login / error BIRT) tidak akan berubah jika di-retry
+            ctype = resp.headers.get("Content-Type", "").lower()
+            if "excel" not in ctype and "spreadsheetml" not in ctype:
+                raise FatalError(f"Bukan XLSX dari {host} (Content-Type: {ctype})")
+
+            buf = bytearray()
+            for chunk in resp.stream(1024 * 64):
+                if not chunk:
+                    break
+                if cancel is not None and cancel.is_set():
+                    resp.close()   # kalah hedging: putuskan koneksi, jangan baca sisanya
+                    raise HedgeCancelled(host)
+                buf += chunk
+
+        breaker.sukses()
+        return buf
+
+    except FatalError as e:
+        breaker.sukses()   # server merespon, masalahnya bukan di koneksi
+        e.base = base
+        raise
+    except CircuitOpenError as e:
+        e.base = base
+        raise
+    except HedgeCancelled as e:
+        breaker.batal()   # bukan sukses / gagal; jika ini percobaan half-open, lepaskan
+        e.base = base
+        raise
+    except Exception as e:
+        if breaker.gagal():
+            log(f"  ⚠ {host} gagal {breaker.failures}x beruntun, "
+                f"diistirahatkan {breaker.cooldown:.0f} dtk")
+        e.base = base
+        raise
+
+    finally:
+        if resp is not None:
+            resp.release_conn()
+
+
+def _download_report(http, selector: ServerSelector, url_for, tag: str,
+                     policy: RetryPolicy, limiter=None):
+    """
+    Download 1 report dari server terbaik. Jika hedging aktif dan request belum
+    selesai setelah hedge_delay(), kirim duplikat ke server berikutnya; hasil
+    pertama yang berhasil dipakai, request lainnya dibatalkan.
+    Return (bytearray, base_url).
+    """
+    bases = selector.urutan()
+    primary = bases[0]
+    if not selector.hedge:
+        return _download_once(http, primary, url_for(primary), policy, limiter), primary
+
+    results = queue.Queue()
+    cancel = threading.Event()
+
+    def run(base):
+        try:
+            results.put((base, _download_once(http, base, url_for(base), policy, limiter, cancel), None))
+        except Exception as e:
+            results.put((base, None, e))
+
+    threading.Thread(target=run, args=(primary,), daemon=True).start()
+    running = 1
+    delay = selector.hedge_delay()
+    try:
+        item = results.get(timeout=delay)
+    except queue.Empty:
+        secondary = bases[1]
+        log(f"    [{tag}] hedge -> {urllib3.util.parse_url(secondary).host} (> {delay:.0f} dtk)")
+        threading.Thread(target=run, args=(secondary,), daemon=True).start()
+        running += 1
+        item = results.get()
+
+    # Pakai hasil pertama yang berhasil; gagal hanya jika semua request gagal
+    first_err = None
+    while True:
+        base, data, err = item
+        running -= 1
+        if err is None:
+            cancel.set()
+            return data, base
+        if first_err is None:
+            first_err = err
+        if running == 0:
+            raise first_err
+        item = results.get()
+
+
+def buat_jobs(blths, unitaps, ups_filter=None, ext=".xlsx", output_dir="."):
+    """
+    Susun matrix BLTH x UNITAP x UP menjadi daftar job (1 job = 1 file output).
+    ups_filter: daftar UP tertentu (kosong/None = semua UP di UNITAP).
+    """
+    jobs = []
+    for blth in blths:
+        for unitap in unitaps:
+            units_all = UNITAP_DICT.get(unitap, [])
+            if not units_all:
+                raise ValueError(f"Daftar UNIT untuk UNITAP {unitap} kosong / tidak ditemukan.")
+
+            if ups_filter:
+                ups = [u for u in units_all if u in ups_filter]
+                if not ups:
+                    continue
+            else:
+                ups = list(units_all)
+
+            suffix = "ALL" if ups == units_all else "_".join(ups)
+            jobs.append({
+                "blth": blth,
+                "unitap": unitap,
+                "ups": ups,
+                "output": os.path.join(output_dir, f"DLPD_ACMT_{unitap}_{blth}_{suffix}{ext}"),
+            })
+    return jobs
+
+
+def jalankan_batch(jobs, server: str, fmt: str = "XLSX",
+                   workers: int = MAX_WORKERS, per_server: int = PER_SERVER_LIMIT, cache=None,
+                   resume: bool = True, checkpoint_dir: str = CHECKPOINT_DIR, hedge: bool = False,
+                   split: str = "NONE", split_ups=None, split_verify: bool = False):
+    """
+    Jalankan semua job lewat 1 connection pool + 1 thread pool bersama.
+    server: INTRANET / INTERNET / AUTO (probe + failover, hedge opsional).
+    split: pecah UP jadi slice paralel (JN / RBM); split_ups membatasi UP yang
+    dipecah (None = semua).
+    Concurrency global = workers, per server dibatasi per_server.
+    cache: ReportCache (opsional) untuk melewati download report yang sama.
+    Tiap UP yang berhasil langsung di-checkpoint; resume=True melewati UP yang
+    sudah ada checkpoint-nya, resume=False memulai run dari nol. Checkpoint job
+    yang selesai lengkap dihapus; cache.force_refresh juga berarti resume=False.
+    Tiap job (UNITAP/BLTH) ditulis ke file sendiri dari checkpoint, UP tetap urut.
+    Return list hasil per job: dict(output, rows, ok, gagal_up).
+    """
+    writer_cls, _ = WRITERS[fmt]
+    if cache is not None and cache.force_refresh:
+        resume = False   # paksa download ulang: data lama di checkpoint juga tidak dipakai
+    checkpoints = [
+        RunCheckpoint(job["unitap"], job["blth"], checkpoint_dir, reset=not resume)
+        for job in jobs
+    ]
+    tasks = [
+        (j, up) for j in range(len(jobs)) for up in jobs[j]["ups"]
+        if not checkpoints[j].selesai(up)
+    ]
+    n_up = sum(len(job["ups"]) for job in jobs)
+    workers = max(1, min(workers, len(tasks) or 1))
+
+    bases = list(SERVERS.values()) if server == "AUTO" else [SERVERS[server]]
+    selector = ServerSelector(bases, hedge)
+
+    log(f"SERVER    : {server}{' + hedge' if selector.hedge else ''}")
+    log(f"JOB       : {len(jobs)} file | {n_up} UP | {n_up - len(tasks)} UP dari checkpoint")
+    log(f"PARALEL   : {workers} UP (maks {per_server}/server)")
+    log(f"READER    : {' -> '.join(pilih_excel_engines())}")
+    if split != "NONE":
+        log(f"PECAH UP  : {split} ({', '.join(split_ups) if split_ups else 'semua UP'})"
+            f"{' + cek TOTAL' if split_verify else ''}")
+    if cache is not None:
+        log(f"CACHE     : {cache.cache_dir}{' (refresh)' if cache.force_refresh else ''}")
+    for job in jobs:
+        log(f"OUTPUT    : {job['output']}  <- {', '.join(job['ups'])}")
     log("=" * 60)
 
+    # maxsize = batas per server, supaya tiap slot punya koneksi sendiri ke host
     http = urllib3.PoolManager(
+        maxsize=per_server,
         cert_reqs="CERT_NONE",
         timeout=urllib3.Timeout(connect=10, read=120),
         headers={
@@ -161,74 +1160,496 @@ def proses_download():
             "Accept": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         }
     )
+    limiter = ServerLimiter(per_server)
+    if selector.auto and tasks:
+        selector.probe(http)
+
+    t_start = time.perf_counter()
+    state = [
+        {"writer": writer_cls(job["output"]), "pending": {}, "next": 0, "gagal": [], "error": None}
+        for job in jobs
+    ]
 
-    dfs_final = []
+    def flush(j):
+        # UP yang selesai lebih dulu ditahan (di checkpoint, bukan di memory)
+        # sampai UP sebelumnya sudah ditulis
+        job, st = jobs[j], state[j]
+        ups = job["ups"]
+        while st["next"] < len(ups) and ups[st["next"]] in st["pending"]:
+            up = ups[st["next"]]
+            dfs = st["pending"].pop(up)
+            if dfs is CKPT:
+                dfs = None
+            elif not dfs:
+                st["gagal"].append(up)
+            if st["error"] is None:
+                try:
+                    if dfs is None:
+                        dfs = checkpoints[j].muat(up)
+                    for df in dfs:
+                        st["writer"].tulis(df)
+                except Exception as e:
+                    st["error"] = e
+                    log(f"  ✖ Gagal menulis {job['output']}: {e}")
+            st["next"] += 1
 
-    for up in ups:
-        log(f"\nUNIT {up}")
+        if st["next"] == len(ups) and "selesai" not in st:
+            st["selesai"] = True
+            writer = st["writer"]
+            try:
+                if st["error"] is not None:
+                    raise st["error"]
+                st["ok"] = writer.tutup()
+            except Exception as e:
+                st["ok"] = False
+                st["error"] = e
+                if os.path.exists(writer.tmp_path):
+                    try:
+                        os.remove(writer.tmp_path)
+                    except OSError:
+                        pass
+            status = "✅" if st["ok"] else "✖"
+            log(f"  {status} {job['output']} | {writer.rows:,} baris")
+            if st["ok"] and not st["gagal"]:
+                checkpoints[j].hapus()   # run selesai: jangan dipakai resume lagi
 
-        for attempt in range(1, MAX_RETRY + 1):
-            log(f"  Attempt {attempt}")
-            tmp_path = None
+    def task(j, up):
+        job = jobs[j]
+        mode = split if not split_ups or up in split_ups else "NONE"
+        dfs, base = download_up(http, selector, job["unitap"], up, job["blth"],
+                                limiter, cache, mode, split_verify)
+        try:
+            if dfs:
+                checkpoints[j].simpan(up, dfs, base)
+            else:
+                checkpoints[j].gagal(up)
+        except Exception as e:
+            log(f"  ⚠ [{up} {job['blth']}] Gagal simpan checkpoint: {e}")
+        return dfs
 
+    progress(up_total=len(tasks))
+
+    # UP yang sudah ada checkpoint langsung masuk antrian tulis
+    for j in range(len(jobs)):
+        for up in jobs[j]["ups"]:
+            if checkpoints[j].selesai(up):
+                state[j]["pending"][up] = CKPT
+        flush(j)
+
+    # Tiap worker langsung mem-parse + checkpoint UP yang sudah selesai diunduh,
+    # sementara UP lain masih berjalan.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(task, j, up): (j, up) for j, up in tasks}
+        for fut in as_completed(futures):
+            j, up = futures[fut]
             try:
-                fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
-                os.close(fd)
+                dfs = fut.result()
+            except Exception as e:
+                log(f"  ✖ [{up} {jobs[j]['blth']}] {e}")
+                dfs = []
+            progress(up_done=1, rows=sum(len(df) for df in dfs))
+            st = state[j]
+            ups = jobs[j]["ups"]
+            # Belum giliran ditulis -> lepas dari memory, nanti dibaca dari checkpoint
+            if dfs and ups[st["next"]] != up and checkpoints[j].selesai(up):
+                dfs = CKPT
+            st["pending"][up] = dfs
+            flush(j)
+
+    log("\n" + "=" * 60)
+    hasil = []
+    for job, st in zip(jobs, state):
+        hasil.append({
+            "output": job["output"],
+            "rows": st["writer"].rows,
+            "ok": bool(st.get("ok")),
+            "gagal_up": st["gagal"],
+        })
+    total_rows = sum(h["rows"] for h in hasil)
+    log(f"SELESAI ✅ TOTAL BARIS: {total_rows:,} | {time.perf_counter() - t_start:.1f} dtk")
+    return hasil
+
+
+# ===================== CLI =====================
+def expand_blth(values):
+    """'202510' atau range '202510-202512' -> list BLTH (YYYYMM)."""
+    result = []
+    for v in values:
+        if "-" in v:
+            a, b = v.split("-", 1)
+            y, m = int(a[:4]), int(a[4:6])
+            end = (int(b[:4]), int(b[4:6]))
+            while (y, m) <= end:
+                result.append(f"{y:04d}{m:02d}")
+                y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        else:
+            result.append(v)
+    return result
 
-                url = URL_TEMPLATE.format(base=base_url, up=up, blth=blth)
-                resp = http.request("GET", url, preload_content=False)
 
-                if resp.status != 200:
-                    raise Exception(f"HTTP {resp.status}")
+def parse_args(argv=None):
+    p = argparse.ArgumentParser("Downloader DLPD ACMT (batch / tanpa GUI)")
+    p.add_argument("--blth", nargs="+", required=True,
+                   help="BLTH YYYYMM, boleh lebih dari 1 atau range 202510-202512")
+    p.add_argument("--unitap", nargs="+", default=["ALL"],
+                   help="Kode UNITAP atau ALL (default ALL)")
+    p.add_argument("--up", nargs="+", default=None,
+                   help="Hanya UP tertentu (default semua UP di UNITAP)")
+    p.add_argument("--server", choices=list(SERVERS) + ["AUTO"], default="INTRANET",
+                   help="AUTO = pilih server tercepat per UP + failover")
+    p.add_argument("--hedge", action="store_true",
+                   help="(AUTO) kirim request duplikat ke server lain jika request lambat")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="XLSX")
+    p.add_argument("--workers", type=int, default=MAX_WORKERS,
+                   help="Jumlah UP paralel (global)")
+    p.add_argument("--per_server", type=int, default=PER_SERVER_LIMIT,
+                   help="Maksimal request bersamaan per server")
+    p.add_argument("--out_dir", default=".")
 
-                ctype = resp.headers.get("Content-Type", "").lower()
-                if "excel" not in ctype and "spreadsheetml" not in ctype:
-                    raise Exception(f"Bukan XLSX (Content-Type: {ctype})")
+    p.add_argument("--split", choices=SPLIT_MODES, default="NONE",
+                   help="Pecah UP jadi beberapa report kecil paralel (JN = rentang jam nyala, RBM)")
+    p.add_argument("--split_up", nargs="+", default=None,
+                   help="Hanya pecah UP tertentu (default semua UP)")
+    p.add_argument("--split_verify", action="store_true",
+                   help="Ikut minta report TOTAL untuk cek jumlah baris hasil gabungan")
 
-                with open(tmp_path, "wb") as f:
-                    for chunk in resp.stream(1024 * 64):
-                        if not chunk:
-                            break
-                        f.write(chunk)
+    p.add_argument("--cache_dir", default=CACHE_DIR)
+    p.add_argument("--no_cache", action="store_true", help="Jangan pakai cache report")
+    p.add_argument("--refresh", action="store_true",
+                   help="Paksa download ulang (cache tetap diperbarui, checkpoint diabaikan)")
+    p.add_argument("--checkpoint_dir", default=CHECKPOINT_DIR)
+    p.add_argument("--no_resume", action="store_true",
+                   help="Abaikan checkpoint run sebelumnya, mulai dari nol")
+    return p.parse_args(argv)
 
-                resp.release_conn()
 
-                sheets = pd.read_excel(tmp_path, sheet_name=None)
+def main_cli(argv=None):
+    args = parse_args(argv)
 
-                total_rows = 0
-                for df in sheets.values():
-                    df["UNITAP"] = unitap
-                    df["UP"] = up
-                    dfs_final.append(df)
-                    total_rows += len(df)
+    try:
+        sys.stdout.reconfigure(encoding="utf-8")
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        pass
 
-                log(f"  ✔ {len(sheets)} sheet | {total_rows:,} baris")
-                break
+    unitaps = list(UNITAP_DICT) if "ALL" in [u.upper() for u in args.unitap] else args.unitap
+    _, ext = WRITERS[args.format]
+    os.makedirs(args.out_dir, exist_ok=True)
 
+    try:
+        jobs = buat_jobs(expand_blth(args.blth), unitaps, args.up, ext, args.out_dir)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 2
+    if not jobs:
+        print("[ERROR] Tidak ada UP yang cocok dengan pilihan.")
+        return 2
+
+    cache = None if args.no_cache else ReportCache(args.cache_dir, force_refresh=args.refresh)
+    hasil = jalankan_batch(jobs, args.server, args.format,
+                           args.workers, args.per_server, cache,
+                           resume=not (args.no_resume or args.refresh),
+                           checkpoint_dir=args.checkpoint_dir,
+                           hedge=args.hedge, split=args.split, split_ups=args.split_up,
+                           split_verify=args.split_verify)
+
+    # 0 = semua lengkap, 1 = sebagian gagal, 2 = tidak ada output sama sekali
+    if not any(h["ok"] for h in hasil):
+        return 2
+    if any(not h["ok"] or h["gagal_up"] for h in hasil):
+        return 1
+    return 0
+
+
+# ===================== UI PUMP =====================
+class UiPump:
+    """
+    Thread worker hanya memasukkan event ke queue (thread-safe); Tk thread
+    menguras queue per batch tiap interval_ms, jadi widget di-update sekali
+    per batch, bukan sekali per baris log / per item.
+    Handler menerima list payload dari 1 batch.
+    """
+
+    def __init__(self, root, interval_ms: int = 100, max_batch: int = 5000):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.q = queue.SimpleQueue()
+        self.handlers = {"call": self._call}
+
+    def on(self, kind: str, fn):
+        self.handlers[kind] = fn
+
+    def emit(self, kind: str, payload=None):
+        self.q.put((kind, payload))
+
+    def call(self, fn, *args):
+        """Jalankan fn(*args) di Tk thread (mis. messagebox dari worker)."""
+        self.emit("call", (fn, args))
+
+    def start(self):
+        self.root.after(self.interval_ms, self._drain)
+
+    def _drain(self):
+        batch = {}
+        try:
+            for _ in range(self.max_batch):
+                kind, payload = self.q.get_nowait()
+                batch.setdefault(kind, []).append(payload)
+        except queue.Empty:
+            pass
+        for kind, payloads in batch.items():
+            try:
+                self.handlers[kind](payloads)
             except Exception as e:
-                log(f"  ✖ {e}")
-                time.sleep(RETRY_DELAY)
+                print(f"[UI] {kind}: {e}")
+        self.root.after(self.interval_ms, self._drain)
 
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+    @staticmethod
+    def _call(payloads):
+        for fn, args in payloads:
+            fn(*args)
 
-    if not dfs_final:
-        messagebox.showerror("Gagal", "Tidak ada data berhasil diunduh")
-        return
 
-    final_df = pd.concat(dfs_final, ignore_index=True)
-    final_df.to_excel(output_file, index=False)
+class Throughput:
+    """Laju (item/dtk, baris/dtk, MB/dtk) + ETA berdasarkan item selesai vs total."""
 
-    log("\n" + "=" * 60)
-    log(f"SELESAI ✅ TOTAL BARIS: {len(final_df):,}")
-    messagebox.showinfo("Selesai", output_file)
+    def __init__(self, total: int = 0):
+        self.t0 = time.perf_counter()
+        self.total = total
+        self.items = 0
+        self.rows = 0
+        self.nbytes = 0
+
+    def tambah(self, items: int = 0, rows: int = 0, nbytes: int = 0):
+        self.items += items
+        self.rows += rows
+        self.nbytes += nbytes
+
+    def teks(self, unit: str = "item") -> str:
+        elapsed = max(time.perf_counter() - self.t0, 1e-6)
+        parts = [f"{unit.upper()} {self.items}/{self.total}"]
+        if self.rows:
+            parts.append(f"{self.rows / elapsed:,.0f} baris/dtk")
+        parts.append(f"{self.nbytes / 1024 / 1024 / elapsed:.2f} MB/dtk")
+        if self.items and self.total > self.items:
+            eta = int(elapsed / self.items * (self.total - self.items))
+            parts.append(f"ETA {eta // 3600:02d}:{eta % 3600 // 60:02d}:{eta % 60:02d}")
+        parts.append(f"{int(elapsed) // 60:02d}:{int(elapsed) % 60:02d} berjalan")
+        return " | ".join(parts)
+
+
+# ===================== GUI =====================
+def run_gui():
+    global _log_handler, _progress_handler
+
+    root = tk.Tk()
+    root.title("Downloader PLN - XLSX Merge Sheets")
+    root.geometry("760x650")
+
+    # -------- SERVER --------
+    tk.Label(root, text="Server", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 0))
+    server_var = tk.StringVar(value="INTRANET")
+
+    frame_server = tk.Frame(root)
+    frame_server.pack(anchor="w", padx=20)
+
+    tk.Radiobutton(frame_server, text="INTRANET (ap2t.pln.co.id)",
+                   variable=server_var, value="INTRANET").pack(anchor="w")
+
+    tk.Radiobutton(frame_server, text="INTERNET (portalapp.iconpln.co.id)",
+                   variable=server_var, value="INTERNET").pack(anchor="w")
+
+    tk.Radiobutton(frame_server, text="AUTO (server tercepat + failover)",
+                   variable=server_var, value="AUTO").pack(anchor="w")
+
+    hedge_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(frame_server, text="Hedging (AUTO): request duplikat jika lambat",
+                   variable=hedge_var).pack(anchor="w", padx=20)
+
+    # -------- INPUT --------
+    frame_input = tk.Frame(root)
+    frame_input.pack(fill="x", padx=10, pady=10)
+
+    tk.Label(frame_input, text="BLTH (YYYYMM)").grid(row=0, column=0, sticky="w")
+    blth_entry = ttk.Entry(frame_input, width=12)
+    blth_entry.grid(row=0, column=1, padx=5)
+    blth_entry.insert(0, "202512")
+
+    tk.Label(frame_input, text="UNITAP").grid(row=1, column=0, sticky="w")
+    unitap_var = tk.StringVar()
+    unitap_combo = ttk.Combobox(
+        frame_input,
+        textvariable=unitap_var,
+        values=list(UNITAP_DICT.keys()),
+        state="readonly",
+        width=15
+    )
+    unitap_combo.grid(row=1, column=1, padx=5)
+    unitap_combo.current(0)
+
+    # -------- DROPDOWN UNIT DATA (DI BAWAH UNITAP) --------
+    tk.Label(frame_input, text="UNITUP").grid(row=2, column=0, sticky="w")
+    unitdata_var = tk.StringVar()
+
+    unitdata_combo = ttk.Combobox(
+        frame_input,
+        textvariable=unitdata_var,
+        state="readonly",
+        width=15
+    )
+    unitdata_combo.grid(row=2, column=1, padx=5)
+
+    def refresh_unitdata_options(*args):
+        unitap = unitap_var.get().strip()
+        units = UNITAP_DICT.get(unitap, [])
+        unitdata_combo["values"] = ["SEMUA"] + units
+        unitdata_combo.current(0)  # default SEMUA
+
+    unitap_combo.bind("<<ComboboxSelected>>", refresh_unitdata_options)
+    refresh_unitdata_options()
+
+    # -------- PARALEL (JUMLAH UP SEKALIGUS) --------
+    tk.Label(frame_input, text="PARALEL UP").grid(row=3, column=0, sticky="w")
+    workers_spin = tk.Spinbox(frame_input, from_=1, to=10, width=5)
+    workers_spin.delete(0, tk.END)
+    workers_spin.insert(0, str(MAX_WORKERS))
+    workers_spin.grid(row=3, column=1, sticky="w", padx=5)
+
+    # -------- FORMAT OUTPUT --------
+    tk.Label(frame_input, text="FORMAT OUTPUT").grid(row=4, column=0, sticky="w")
+    format_var = tk.StringVar()
+    format_combo = ttk.Combobox(
+        frame_input,
+        textvariable=format_var,
+        values=OUTPUT_FORMATS,
+        state="readonly",
+        width=15
+    )
+    format_combo.grid(row=4, column=1, padx=5)
+    format_combo.current(0)
+
+    # -------- CACHE --------
+    cache_var = tk.BooleanVar(value=True)
+    refresh_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(frame_input, text="Pakai cache", variable=cache_var).grid(row=5, column=0, sticky="w")
+    tk.Checkbutton(frame_input, text="Paksa download ulang", variable=refresh_var).grid(row=5, column=1, sticky="w")
+
+    # -------- RESUME --------
+    resume_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(frame_input, text="Lanjutkan run sebelumnya (lewati UP yang sudah selesai)",
+                   variable=resume_var).grid(row=6, column=0, columnspan=2, sticky="w")
+
+    # -------- PECAH UP BESAR --------
+    tk.Label(frame_input, text="PECAH UP").grid(row=7, column=0, sticky="w")
+    split_var = tk.StringVar()
+    split_combo = ttk.Combobox(
+        frame_input,
+        textvariable=split_var,
+        values=SPLIT_MODES,
+        state="readonly",
+        width=15
+    )
+    split_combo.grid(row=7, column=1, padx=5)
+    split_combo.current(0)
+
+    # -------- LOG --------
+    tk.Label(root, text="Log Proses", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10)
+    log_box = tk.Text(root, height=20)
+    log_box.pack(fill="both", expand=True, padx=10, pady=(0, 4))
+
+    status_var = tk.StringVar(value="-")
+    tk.Label(root, textvariable=status_var, anchor="w").pack(fill="x", padx=10)
+
+    # -------- UI PUMP: worker -> queue -> Tk thread (per batch) --------
+    pump = UiPump(root)
+    meter = {"m": Throughput()}
+
+    def on_log(lines):
+        log_box.insert(tk.END, "\n".join(lines) + "\n")
+        n_lines = int(log_box.index("end-1c").split(".")[0])
+        if n_lines > MAX_LOG_LINES:
+            log_box.delete("1.0", f"{n_lines - MAX_LOG_LINES}.0")
+        log_box.see(tk.END)
+
+    def on_clear(_):
+        log_box.delete("1.0", tk.END)
+        meter["m"] = Throughput()
+        status_var.set("-")
+
+    def on_progress(infos):
+        m = meter["m"]
+        for info in infos:
+            if "up_total" in info:
+                m.total = info["up_total"]
+            m.tambah(info.get("up_done", 0), info.get("rows", 0), info.get("nbytes", 0))
+        status_var.set(m.teks("UP"))
+
+    pump.on("log", on_log)
+    pump.on("clear", on_clear)
+    pump.on("progress", on_progress)
+    pump.start()
+
+    _log_handler = lambda msg: pump.emit("log", msg)
+    _progress_handler = lambda info: pump.emit("progress", info)
+
+    def proses_download(jobs, server, fmt, workers, cache, resume, hedge, split, unitap, unit_selected):
+        log(f"UNITAP    : {unitap}")
+        log(f"UNITUP    : {unit_selected if unit_selected else 'SEMUA'}")
+
+        hasil = jalankan_batch(jobs, server, fmt, workers, PER_SERVER_LIMIT, cache,
+                               resume=resume, hedge=hedge, split=split)
+
+        if not hasil or not hasil[0]["ok"]:
+            pump.call(messagebox.showerror, "Gagal", "Tidak ada data berhasil diunduh")
+            return
+        pump.call(messagebox.showinfo, "Selesai", hasil[0]["output"])
+
+    def mulai():
+        # Semua widget dibaca di Tk thread, worker hanya menerima nilainya
+        pump.emit("clear")
+
+        blth = blth_entry.get().strip()
+        unitap = unitap_var.get().strip()
+        unit_selected = unitdata_var.get().strip()
+        fmt = format_var.get() or "XLSX"
+        _, ext = WRITERS[fmt]
+
+        try:
+            workers = int(workers_spin.get())
+        except ValueError:
+            workers = MAX_WORKERS
+
+        server = server_var.get()
+        bases = list(SERVERS.values()) if server == "AUTO" else [SERVERS[server]]
+        if not all(b.startswith("https://") for b in bases):
+            messagebox.showerror("Error", "Base URL HARUS https://")
+            return
+
+        # ---- TENTUKAN LIST UNIT YANG DIPROSES ----
+        ups_filter = [unit_selected] if unit_selected and unit_selected != "SEMUA" else None
+        try:
+            jobs = buat_jobs([blth], [unitap], ups_filter, ext)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        cache = ReportCache(force_refresh=refresh_var.get()) if cache_var.get() else None
+        threading.Thread(
+            target=proses_download,
+            args=(jobs, server, fmt, workers, cache,
+                  resume_var.get() and not refresh_var.get(), hedge_var.get(),
+                  split_var.get() or "NONE", unitap, unit_selected),
+            daemon=True
+        ).start()
+
+    # -------- BUTTON --------
+    ttk.Button(root, text="▶ MULAI PROSES", command=mulai).pack(pady=10)
+
+    root.mainloop()
 
-# -------- BUTTON --------
-ttk.Button(
-    root,
-    text="▶ MULAI PROSES",
-    command=lambda: threading.Thread(target=proses_download, daemon=True).start()
-).pack(pady=10)
 
-root.mainloop()
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main_cli())
+    run_gui()
@@ -1,4 +1,9 @@
 from pathlib import Path
+from collections import Counter
+import argparse
+import os
+import zlib
+import sqlite3
 import sys
 
 # Paksa encoding output UTF-8 (agar tidak error di Windows cp1252)
@@ -12,32 +17,306 @@ INPUT_FILE = Path("idpel.txt")
 OUTPUT_DIR = Path("1_split_idpel")
 LINES_PER_FILE = 50000
 
-def split_file(input_file: Path, lines_per_file: int = LINES_PER_FILE) -> None:
+IDPEL_LEN = 12
+UP_PREFIX_LEN = 5          # 5 digit awal IDPEL = kode UP
+HASH_SHARDS = 8
+SHARD_MODES = ["count", "hash", "up"]
+DEDUP_MODES = ["set", "bitmap"]
+REJECT_FILE = "idpel_ditolak.txt"
+PHOTO_DIR = Path("2_images")
+IMG_EXT = {".jpg", ".jpeg", ".png"}
+
+
+# =====================================================
+# Normalisasi + validasi
+# =====================================================
+def normalize_idpel(line: str):
+    """
+    Return (idpel, "") jika valid 12 digit, atau ("", alasan) jika ditolak.
+    Toleran terhadap spasi, tanda kutip dan akhiran ".0" dari export Excel.
+    """
+    s = line.strip().strip("\"'").strip()
+    if not s:
+        return "", "kosong"
+    if s.endswith(".0"):
+        s = s[:-2]
+    if not s.isdigit():
+        return "", "bukan angka"
+    if len(s) != IDPEL_LEN:
+        return "", f"panjang {len(s)} digit"
+    return s, ""
+
+
+# =====================================================
+# Dedup: set biasa atau bitmap per prefix UP
+# =====================================================
+class SeenSet:
+    """Set int (lebih hemat dari set string); cocok sampai beberapa juta ID."""
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, idpel: str) -> bool:
+        """Return True jika ID baru (belum pernah terlihat)."""
+        n = int(idpel)
+        if n in self._seen:
+            return False
+        self._seen.add(n)
+        return True
+
+    def __contains__(self, idpel: str) -> bool:
+        return int(idpel) in self._seen
+
+    def __len__(self):
+        return len(self._seen)
+
+
+class SeenBitmap:
+    """
+    Bitmap per prefix UP: 1 bit per nomor urut (7 digit sisa IDPEL),
+    ~1.2 MB per UP berapapun jumlah ID-nya. Untuk input puluhan juta baris.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._size = 10 ** (IDPEL_LEN - UP_PREFIX_LEN)
+        self._count = 0
+
+    def add(self, idpel: str) -> bool:
+        prefix, n = idpel[:UP_PREFIX_LEN], int(idpel[UP_PREFIX_LEN:])
+        bits = self._bits.get(prefix)
+        if bits is None:
+            bits = self._bits[prefix] = bytearray((self._size + 7) // 8)
+        byte, mask = n >> 3, 1 << (n & 7)
+        if bits[byte] & mask:
+            return False
+        bits[byte] |= mask
+        self._count += 1
+        return True
+
+    def __contains__(self, idpel: str) -> bool:
+        bits = self._bits.get(idpel[:UP_PREFIX_LEN])
+        if bits is None:
+            return False
+        n = int(idpel[UP_PREFIX_LEN:])
+        return bool(bits[n >> 3] & (1 << (n & 7)))
+
+    def __len__(self):
+        return self._count
+
+
+def new_seen(dedup: str = "set"):
+    return SeenBitmap() if dedup == "bitmap" else SeenSet()
+
+
+# =====================================================
+# Index foto yang sudah ada (untuk split incremental)
+# =====================================================
+def _scan_photo_dir(folder: Path, blth: str, index, flat_ok: bool = True):
+    """flat_ok: {idpel}.jpg tanpa BLTH di nama ikut dihitung (folder per bulan)."""
+    try:
+        it = os.scandir(folder)
+    except FileNotFoundError:
+        return
+    with it:
+        for entry in it:
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() not in IMG_EXT or not entry.is_file():
+                continue
+            # {idpel}.jpg (folder per bulan) atau {idpel}_{blth}[_n].jpg
+            parts = stem.split("_")
+            idpel = parts[0]
+            if len(idpel) != IDPEL_LEN or not idpel.isdigit():
+                continue
+            if len(parts) == 1 and not flat_ok:
+                continue
+            if blth and len(parts) > 1 and parts[1] != blth:
+                continue
+            if entry.stat().st_size == 0:
+                continue
+            index.add(idpel)
+
+
+def index_photo_store(store: Path, blth: str = "", dedup: str = "set"):
+    """
+    Index IDPEL yang fotonya sudah ada dengan 1x os.scandir per folder
+    (bukan os.path.exists per ID). Folder {store}/{blth} ikut di-scan jika ada.
+    Dengan --blth, {idpel}.jpg di root store tidak dihitung: downloader mode
+    1 bulan menulis nama tanpa BLTH, jadi bisa saja foto bulan lain.
+    """
+    index = new_seen(dedup)
+    _scan_photo_dir(store, blth, index, flat_ok=not blth)
+    if blth:
+        _scan_photo_dir(store / blth, blth, index)
+    return index
+
+
+def load_done_list(path: Path, index):
+    """Tambahkan IDPEL dari file daftar (1 ID per baris / kolom pertama CSV)."""
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            idpel, _ = normalize_idpel(line.split(",")[0].split("\t")[0])
+            if idpel:
+                index.add(idpel)
+    return index
+
+
+def load_manifest(path: Path, blth: str, index):
+    """Tambahkan IDPEL berstatus ok dari manifest SQLite downloader foto."""
+    db = sqlite3.connect(str(path))
+    try:
+        for (idpel,) in db.execute("SELECT idpel FROM foto WHERE blth = ? AND status = 'ok'", (blth,)):
+            index.add(idpel)
+    finally:
+        db.close()
+    return index
+
+
+# =====================================================
+# Sharding: per jumlah baris, per hash, atau per prefix UP
+# =====================================================
+class ShardWriter:
+    """Tulis ID ke file shard secara streaming (tanpa buffer list)."""
+
+    def __init__(self, output_dir: Path, mode: str = "count",
+                 lines_per_file: int = LINES_PER_FILE, shards: int = HASH_SHARDS):
+        self.output_dir = output_dir
+        self.mode = mode
+        self.lines_per_file = lines_per_file
+        self.shards = shards
+        self.files = {}
+        self.counts = Counter()
+        self._part = 0
+
+    def _shard_name(self, idpel: str) -> str:
+        if self.mode == "hash":
+            return f"idpel_hash{zlib.crc32(idpel.encode()) % self.shards + 1}.txt"
+        if self.mode == "up":
+            return f"idpel_up{idpel[:UP_PREFIX_LEN]}.txt"
+
+        # count: file baru setiap lines_per_file ID
+        name = f"idpel_part{self._part}.txt"
+        if self._part == 0 or self.counts[name] >= self.lines_per_file:
+            if name in self.files:
+                self.files.pop(name).close()
+            self._part += 1
+            name = f"idpel_part{self._part}.txt"
+        return name
+
+    def write(self, idpel: str):
+        name = self._shard_name(idpel)
+        f = self.files.get(name)
+        if f is None:
+            f = self.files[name] = (self.output_dir / name).open("w", encoding="utf-8")
+        f.write(idpel + "\n")
+        self.counts[name] += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+
+# =====================================================
+# Split
+# =====================================================
+def iter_valid_ids(input_file: Path, dedup: str = "set", rejects=None, stats=None, skip=None):
+    """
+    Baca file baris per baris, yield IDPEL 12 digit yang valid dan unik.
+    Baris ditolak ditulis ke `rejects` (file) dan dihitung di `stats`.
+    ID yang ada di `skip` (index foto yang sudah diunduh) dilewati.
+    """
+    seen = new_seen(dedup)
+    stats = stats if stats is not None else Counter()
+
+    with input_file.open("r", encoding="utf-8", errors="replace") as f:
+        for i, line in enumerate(f, start=1):
+            stats["baris"] += 1
+            idpel, alasan = normalize_idpel(line)
+            if not idpel:
+                stats[alasan] += 1
+                if rejects is not None and alasan != "kosong":
+                    rejects.write(f"{i}\t{alasan}\t{line.rstrip()}\n")
+                continue
+            if not seen.add(idpel):
+                stats["duplikat"] += 1
+                continue
+            stats["valid"] += 1
+            if skip is not None and idpel in skip:
+                stats["sudah ada"] += 1
+                continue
+            yield idpel
+
+
+def split_file(input_file: Path, lines_per_file: int = LINES_PER_FILE,
+               mode: str = "count", shards: int = HASH_SHARDS, dedup: str = "set",
+               output_dir: Path = OUTPUT_DIR, skip=None) -> Counter:
     if not input_file.exists():
         raise FileNotFoundError(f"File not found: {input_file}")
 
     # Pastikan folder output ada
-    OUTPUT_DIR.mkdir(exist_ok=True)
+    output_dir.mkdir(exist_ok=True)
+
+    stats = Counter()
+    writer = ShardWriter(output_dir, mode, lines_per_file, shards)
+    try:
+        with (output_dir / REJECT_FILE).open("w", encoding="utf-8") as rejects:
+            rejects.write("baris\talasan\tisi\n")
+            for idpel in iter_valid_ids(input_file, dedup, rejects, stats, skip):
+                writer.write(idpel)
+    finally:
+        writer.close()
+
+    print(f"Split selesai. File hasil disimpan di folder: {output_dir}")
+    print(f"  Total baris     : {stats['baris']:,}")
+    print(f"  IDPEL valid     : {stats['valid']:,}")
+    if skip is not None:
+        print(f"  Sudah diunduh   : {stats['sudah ada']:,} (dilewati)")
+    print(f"  Ditulis         : {sum(writer.counts.values()):,} -> {len(writer.counts)} file ({mode})")
+    print(f"  Duplikat        : {stats['duplikat']:,}")
+    print(f"  Baris kosong    : {stats['kosong']:,}")
+    for alasan, n in stats.items():
+        if alasan not in ("baris", "valid", "duplikat", "kosong", "sudah ada"):
+            print(f"  Ditolak ({alasan}): {n:,}")
+    print(f"  Detail ditolak  : {output_dir / REJECT_FILE}")
+    return stats
+
+
+def parse_args():
+    p = argparse.ArgumentParser("Split idpel.txt -> file per shard (valid, unik)")
+    p.add_argument("--input", default=str(INPUT_FILE))
+    p.add_argument("--output_dir", default=str(OUTPUT_DIR))
+    p.add_argument("--mode", choices=SHARD_MODES, default="count",
+                   help="count = per jumlah baris, hash = N shard rata, up = per prefix UP")
+    p.add_argument("--lines", type=int, default=LINES_PER_FILE,
+                   help="Jumlah ID per file (mode count)")
+    p.add_argument("--shards", type=int, default=HASH_SHARDS,
+                   help="Jumlah shard (mode hash)")
+    p.add_argument("--dedup", choices=DEDUP_MODES, default="set",
+                   help="bitmap = hemat memory untuk input puluhan juta baris")
+    p.add_argument("--store", default="",
+                   help=f"Folder foto (mis. {PHOTO_DIR}); IDPEL yang fotonya sudah ada tidak ikut di-split")
+    p.add_argument("--blth", default="", help="BLTH foto yang dicek di --store (mis. 202510)")
+    p.add_argument("--done", default="", help="File daftar IDPEL yang sudah selesai diunduh")
+    p.add_argument("--manifest", default="",
+                   help="Manifest SQLite downloader foto (0_manifest_foto.sqlite), butuh --blth")
+    return p.parse_args()
 
-    with input_file.open("r", encoding="utf-8") as f:
-        part = 1
-        buffer = []
-        for i, line in enumerate(f, start=1):
-            buffer.append(line)
-            if i % lines_per_file == 0:
-                output_file = OUTPUT_DIR / f"idpel_part{part}.txt"
-                with output_file.open("w", encoding="utf-8") as out:
-                    out.writelines(buffer)
-                buffer.clear()
-                part += 1
-
-        # Sisa baris terakhir
-        if buffer:
-            output_file = OUTPUT_DIR / f"idpel_part{part}.txt"
-            with output_file.open("w", encoding="utf-8") as out:
-                out.writelines(buffer)
-
-    print(f"Split selesai. File hasil disimpan di folder: {OUTPUT_DIR}")
 
 if __name__ == "__main__":
-    split_file(INPUT_FILE)
\ No newline at end of file
+    args = parse_args()
+
+    skip = None
+    if args.manifest and not args.blth:
+        sys.exit("--manifest butuh --blth")
+    if args.store or args.done or args.manifest:
+        skip = new_seen(args.dedup)
+        if args.store:
+            skip = index_photo_store(Path(args.store), args.blth, args.dedup)
+        if args.done:
+            load_done_list(Path(args.done), skip)
+        if args.manifest:
+            load_manifest(Path(args.manifest), args.blth, skip)
+        print(f"[INFO] Index foto sudah ada: {len(skip):,} IDPEL")
+
+    split_file(Path(args.input), args.lines, args.mode, args.shards, args.dedup, Path(args.output_dir), skip)
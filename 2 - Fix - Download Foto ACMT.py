@@ -1,9 +1,25 @@
 # pip install requests urllib3
+# opsional (engine ASYNC): pip install httpx   | + HTTP/2: pip install "httpx[http2]"
+# opsional (turunan foto): pip install numpy pillow
 
+import io
 import os
+import sys
+import json
+import queue
+import shutil
+import sqlite3
+import asyncio
+import heapq
+import hashlib
+import argparse
+import importlib.util
+import random
 import requests
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager, AsyncExitStack
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import threading
@@ -14,7 +30,544 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # =================== KONFIGURASI DEFAULT =================== #
 DEFAULT_RETRIES = 1     # default maksimal dicoba ulang
-RETRY_DELAY = 1         # detik jeda tiap gagal
+RETRY_DELAY = 1         # jeda awal (detik), naik eksponensial + jitter
+RETRY_MAX_DELAY = 30    # jeda maksimal antar retry
+CB_THRESHOLD = 20       # gagal beruntun sebelum server "diistirahatkan"
+CB_COOLDOWN = 30        # lama istirahat (detik) sebelum 1 request percobaan
+CB_TRIAL_TIMEOUT = 120  # request percobaan tanpa hasil selama ini -> boleh percobaan baru
+
+# Engine download: THREAD = ThreadPoolExecutor + requests (default lama),
+# ASYNC = asyncio + httpx, ratusan request in-flight lewat koneksi keep-alive
+ENGINES = ["THREAD", "ASYNC"]
+THREAD_WORKERS = 10
+ASYNC_CONCURRENCY = 200
+REQUEST_TIMEOUT = 15
+
+# Rate limit + AIMD: request in-flight naik selama latency & error sehat,
+# turun (x AIMD_DECREASE) saat p95 melonjak / error naik. Batas atas =
+# THREAD_MAX (engine THREAD) atau nilai "paralel" (engine ASYNC).
+RATE_LIMIT = 0          # request/detik maksimal (0 = tanpa batas)
+RATE_BURST = 20
+THREAD_MAX = 32
+AIMD_MIN = 2
+AIMD_WINDOW = 50        # evaluasi tiap N request selesai
+AIMD_ERR_RATE = 0.05    # error rate di atas ini -> turun
+AIMD_LAT_FACTOR = 2.0   # p95 > faktor x p50 terbaik -> turun
+AIMD_DECREASE = 0.7
+
+# Validasi foto: body di-stream ke {file}.part, dicek marker JPEG, baru di-rename
+CHUNK_SIZE = 64 * 1024
+VALIDATE_DECODE = False  # True = cek header gambar via Pillow (jika terpasang)
+
+LOG_FOLDER = "4_log_gagal_unduh_foto"
+
+# Beberapa cookie (dipisah baris baru / "||") = beberapa sesi bergiliran.
+# Sesi dikeluarkan dari rotasi jika di-redirect (ke login) atau mendapat
+# HTML SESSION_STRIKES kali beruntun.
+SESSION_STRIKES = 3
+SERVERS = {"INTERNET": "portalapp.iconpln.co.id", "INTRANET": "ap2t.pln.co.id"}
+
+# Manifest (idpel, blth) -> status unduhan; rerun melewati yang sudah selesai
+MANIFEST_DB = "0_manifest_foto.sqlite"
+MANIFEST_BATCH = 200     # jumlah record per commit ke SQLite
+RUN_MODES = ["Lanjutkan", "Ulang yang gagal", "Semua (abaikan manifest)"]
+
+# Riwayat multi-bulan: THBL range / >1 foto per bulan -> 2_images/{blth}/{idpel}_{blth}_{n}.jpg
+# (n = nomor foto = DisplayBlobServlet{n}); 1 bulan + foto 1 tetap 2_images/{idpel}.jpg
+FOTO_INDEX = [1]
+
+# Content-addressed store: isi foto disimpan 1x per sha256 di BLOB_DIR, nama
+# {idpel}.jpg di 2_images hanya hardlink ke blob. FS tanpa hardlink (FAT/exFAT,
+# beda volume) dideteksi 1x -> foto disimpan biasa tanpa salinan di blob.
+# Hash placeholder (gambar "foto tidak ada" dsb.) di-link ke PLACEHOLDER_DIR,
+# bukan 2_images, jadi tidak ikut diverifikasi.
+CONTENT_STORE = True
+BLOB_DIR = "2_blob_foto"
+PLACEHOLDER_DIR = "2_placeholder"
+PLACEHOLDER_FILE = "placeholder_sha256.txt"   # di BLOB_DIR, 1 sha256 per baris
+KNOWN_PLACEHOLDERS = set()
+
+# Turunan saat ingest (opsional): foto di-decode 1x dari bytes yang masih di
+# memory -> {foto}.derived.npz di sebelah file asli (array RGB ukuran model +
+# metrik grayscale) dan thumbnail JPEG di THUMB_DIR (struktur folder sama
+# dengan 2_images). Script verifikasi TFLITE & dashboard memakainya tanpa
+# decode ulang foto resolusi penuh.
+DERIVE = False
+DERIVE_SIZE = 224                  # input Teachable Machine
+DERIVE_RESIZE = "stretch"          # stretch = script Excel TFLITE, fit = crop tengah (Verifikasi Fisik)
+DERIVE_MODES = ["stretch", "fit"]
+DERIVED_EXT = ".derived.npz"
+THUMB_DIR = "2_thumbs"
+THUMB_PX = 160
+
+
+# =================== RETRY POLICY =================== #
+# FatalError / RetryableError / CircuitOpenError / RetryPolicy / CircuitBreaker
+# sama dengan downloader DLPD ACMT; PayloadError & SessionExpired khusus foto
+class FatalError(Exception):
+    """Error yang tidak akan berubah walau di-retry (4xx, halaman login, dll)."""
+
+
+class RetryableError(Exception):
+    """Error sementara (5xx, 429, ...); retry_after dari header Retry-After jika ada."""
+
+    def __init__(self, msg, retry_after=None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Server sedang diistirahatkan oleh circuit breaker."""
+
+
+class PayloadError(Exception):
+    """Isi respon bukan JPEG utuh (terpotong / bukan gambar); di-retry."""
+
+
+class SessionExpired(Exception):
+    """Respon login / HTML: cookie sesi ini kemungkinan sudah tidak berlaku."""
+
+    def __init__(self, msg, pasti=False):
+        super().__init__(msg)
+        self.pasti = pasti   # True = redirect (pasti expired), False = HTML (bisa khusus 1 ID)
+
+
+class RetryPolicy:
+    """Exponential backoff + jitter; status HTTP dipilah retryable vs fatal."""
+
+    RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+    def __init__(self, max_retry=DEFAULT_RETRIES, base_delay=RETRY_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.max_retry = max(1, max_retry)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        d = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        d = d / 2 + random.uniform(0, d / 2)
+        if retry_after:
+            d = max(d, min(retry_after, self.max_delay))
+        return d
+
+    def cek_status(self, status, retry_after=None):
+        if status == 200:
+            return
+        if status in self.RETRYABLE_STATUS or status >= 500:
+            try:
+                retry_after = float(retry_after)
+            except (TypeError, ValueError):
+                retry_after = None
+            raise RetryableError(f"HTTP {status}", retry_after)
+        raise FatalError(f"HTTP {status}")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per host: setelah CB_THRESHOLD gagal beruntun, host tidak
+    di-request selama CB_COOLDOWN detik, lalu 1 request percobaan (half-open).
+    Percobaan yang dibatalkan (batal) atau tidak selesai dalam CB_TRIAL_TIMEOUT
+    detik tidak mengunci breaker di half-open.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, host, threshold=CB_THRESHOLD, cooldown=CB_COOLDOWN, trial_timeout=CB_TRIAL_TIMEOUT):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trial_timeout = trial_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def untuk(cls, host):
+        with cls._registry_lock:
+            if host not in cls._registry:
+                cls._registry[host] = cls(host)
+            return cls._registry[host]
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.cooldown:
+                self.state = "half_open"   # request ini jadi percobaan
+                self.trial_at = now
+                return True
+            if self.state == "half_open" and now - self.trial_at >= self.trial_timeout:
+                self.trial_at = now        # percobaan sebelumnya tidak pernah selesai
+                return True
+            return False
+
+    def batal(self):
+        """Request selesai tanpa hasil (mis. dibatalkan): lepas jatah percobaan half-open."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.cooldown   # langsung boleh percobaan baru
+
+    def sisa(self):
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def sukses(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def gagal(self):
+        """Catat kegagalan. Return True jika breaker baru saja terbuka."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+# =================== SESSION POOL =================== #
+def pisah_cookie(text):
+    """'c1 || c2' atau 1 cookie per baris -> list cookie."""
+    return [c.strip() for c in str(text or "").replace("||", "\n").splitlines() if c.strip()]
+
+
+def buat_headers(base_url, cookie):
+    return {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+        "Connection": "keep-alive",
+        "Referer": f"https://{base_url}/acmt/Main.html",
+        "Cookie": cookie,
+    }
+
+
+class SessionPool:
+    """
+    Rotasi round-robin beberapa sesi (requests.Session / httpx.AsyncClient).
+    Sesi expired dikeluarkan; job-nya diulang di sesi lain tanpa dihitung gagal.
+    Jika semua sesi habis, ambil() raise FatalError.
+    """
+
+    def __init__(self, klien, strikes=SESSION_STRIKES):
+        self.items = [{"klien": k, "nama": f"sesi{i + 1}", "aktif": True, "html": 0, "ok": 0}
+                      for i, k in enumerate(klien)]
+        self.strikes = strikes
+        self._i = 0
+        self._lock = threading.Lock()
+
+    def ambil(self):
+        with self._lock:
+            for _ in range(len(self.items)):
+                item = self.items[self._i % len(self.items)]
+                self._i += 1
+                if item["aktif"]:
+                    return item
+        raise FatalError("Semua sesi/cookie expired, login ulang lalu jalankan 'Lanjutkan'")
+
+    def sukses(self, item):
+        item["html"] = 0
+        item["ok"] += 1
+
+    def expired(self, item, e):
+        """Catat SessionExpired. Return True jika sesi dikeluarkan dari rotasi."""
+        with self._lock:
+            if not item["aktif"]:
+                return True
+            item["html"] += 1
+            if not (e.pasti or item["html"] >= self.strikes):
+                return False
+            item["aktif"] = False
+            sisa = sum(1 for x in self.items if x["aktif"])
+        print(f"[WARN] {item['nama']} dikeluarkan dari rotasi: {e} | sisa {sisa} sesi aktif")
+        return True
+
+    def aktif(self):
+        return sum(1 for x in self.items if x["aktif"])
+
+
+# =================== RATE LIMIT + AIMD =================== #
+class TokenBucket:
+    """Maks `rate` request/detik dengan burst `burst`."""
+
+    def __init__(self, rate, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.t = time.monotonic()
+
+    def ambil(self):
+        """Ambil 1 token; return 0 jika dapat, atau detik sampai token berikutnya."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket (opsional) + batas in-flight AIMD. Tiap AIMD_WINDOW request
+    selesai: jika error rate <= AIMD_ERR_RATE dan p95 <= AIMD_LAT_FACTOR x
+    p50 terbaik, limit naik ~10% (min +1); jika tidak, limit x AIMD_DECREASE.
+    Dipakai engine THREAD (slot) dan ASYNC (slot_async). Saat limit penuh,
+    penunggu tidur di Condition dan dibangunkan saat slot dilepas (tanpa polling).
+    """
+
+    def __init__(self, start, max_conc, min_conc=AIMD_MIN, rate=RATE_LIMIT):
+        self.max = max(1, max_conc)
+        self.min = max(1, min(min_conc, self.max))
+        self.limit = float(min(max(start, self.min), self.max))
+        self.bucket = TokenBucket(rate) if rate else None
+        self.inflight = 0
+        self.latencies = deque(maxlen=1000)
+        self.best_p50 = None
+        self._win = []
+        self._win_err = 0
+        self._lock = threading.Lock()
+        self._bebas = threading.Condition(self._lock)   # engine THREAD
+        self._bebas_async = None                          # engine ASYNC (dibuat di event loop)
+
+    def slot_bebas(self):
+        return int(self.limit) - self.inflight
+
+    def coba_masuk(self):
+        """
+        Return 0 jika boleh request sekarang, None jika limit in-flight penuh,
+        atau detik yang perlu ditunggu (token bucket).
+        """
+        with self._lock:
+            if self.slot_bebas() <= 0:
+                return None
+            if self.bucket is not None:
+                w = self.bucket.ambil()
+                if w:
+                    return w
+            self.inflight += 1
+            return 0.0
+
+    def keluar(self, latency, ok):
+        with self._lock:
+            self.inflight -= 1
+            self.latencies.append(latency)
+            self._win.append(latency)
+            self._win_err += 0 if ok else 1
+            if len(self._win) >= AIMD_WINDOW:
+                self._evaluasi()
+            self._bebas.notify(max(0, self.slot_bebas()))
+
+    def _evaluasi(self):
+        win = sorted(self._win)
+        p50, p95 = win[len(win) // 2], win[int(len(win) * 0.95)]
+        err_rate = self._win_err / len(win)
+        if err_rate == 0 and (self.best_p50 is None or p50 < self.best_p50):
+            self.best_p50 = p50
+        if err_rate > AIMD_ERR_RATE or (self.best_p50 and p95 > AIMD_LAT_FACTOR * max(self.best_p50, 0.05)):
+            self.limit = max(self.min, self.limit * AIMD_DECREASE)
+        else:
+            self.limit = min(self.max, self.limit + max(1.0, self.limit * 0.1))
+        self._win = []
+        self._win_err = 0
+
+    def persentil(self, q):
+        with self._lock:
+            lat = sorted(self.latencies)
+        return lat[min(len(lat) - 1, int(len(lat) * q))] if lat else 0.0
+
+    def info(self):
+        return {
+            "limit": int(self.limit),
+            "p50_ms": round(self.persentil(0.5) * 1000),
+            "p95_ms": round(self.persentil(0.95) * 1000),
+        }
+
+    def teks(self):
+        return (f"limit {int(self.limit)} | p50 {self.persentil(0.5) * 1000:.0f} ms, "
+                f"p95 {self.persentil(0.95) * 1000:.0f} ms")
+
+    @contextmanager
+    def slot(self):
+        while True:
+            w = self.coba_masuk()
+            if w is None:
+                with self._bebas:
+                    self._bebas.wait_for(lambda: self.slot_bebas() > 0)
+                continue
+            if not w:
+                break
+            time.sleep(w)
+        t0, ok = time.perf_counter(), True
+        try:
+            yield
+        except FatalError:
+            raise   # server merespon normal (404, login, dll)
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.keluar(time.perf_counter() - t0, ok)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        if self._bebas_async is None:
+            self._bebas_async = asyncio.Condition()
+        cond = self._bebas_async
+        while True:
+            w = self.coba_masuk()
+            if w is None:
+                async with cond:
+                    await cond.wait_for(lambda: self.slot_bebas() > 0)
+                continue
+            if not w:
+                break
+            await asyncio.sleep(w)
+        t0, ok = time.perf_counter(), True
+        try:
+            yield
+        except FatalError:
+            raise
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.keluar(time.perf_counter() - t0, ok)
+            async with cond:
+                cond.notify(max(0, self.slot_bebas()))
+
+
+# =================== MANIFEST =================== #
+class DownloadManifest:
+    """
+    SQLite per (idpel, blth): status, byte, sha256, HTTP status, latency, attempts.
+    Record di-buffer dan ditulis per MANIFEST_BATCH (executemany + upsert),
+    aman dipanggil dari banyak thread.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS foto (
+            idpel       TEXT NOT NULL,
+            blth        TEXT NOT NULL,
+            status      TEXT NOT NULL,
+            nbytes      INTEGER,
+            sha256      TEXT,
+            http_status INTEGER,
+            latency_ms  INTEGER,
+            attempts    INTEGER NOT NULL DEFAULT 0,
+            error       TEXT,
+            updated_at  TEXT,
+            PRIMARY KEY (idpel, blth)
+        )
+    """
+    UPSERT = """
+        INSERT INTO foto (idpel, blth, status, nbytes, sha256, http_status,
+                          latency_ms, attempts, error, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+        ON CONFLICT (idpel, blth) DO UPDATE SET
+            status = excluded.status,
+            nbytes = excluded.nbytes,
+            sha256 = excluded.sha256,
+            http_status = excluded.http_status,
+            latency_ms = excluded.latency_ms,
+            attempts = foto.attempts + excluded.attempts,
+            error = excluded.error,
+            updated_at = excluded.updated_at
+    """
+
+    def __init__(self, path=MANIFEST_DB, batch=MANIFEST_BATCH):
+        self.path = path
+        self.batch = batch
+        self._buf = []
+        self._lock = threading.Lock()
+        # timeout: beberapa shard paralel menulis ke manifest yang sama
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(self.SCHEMA)
+        self.db.commit()
+
+    def catat(self, idpel, blth, status, nbytes=0, sha256="", http_status=None,
+              latency=0.0, attempts=1, error=""):
+        with self._lock:
+            self._buf.append((idpel, blth, status, nbytes, sha256, http_status,
+                              int(latency * 1000), attempts, error[:500]))
+            if len(self._buf) >= self.batch:
+                self._flush()
+
+    def _flush(self):
+        if self._buf:
+            self.db.executemany(self.UPSERT, self._buf)
+            self.db.commit()
+            self._buf = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def status_map(self, blth):
+        """{idpel: status} untuk 1 BLTH (1 query, bukan per ID)."""
+        self.flush()
+        return dict(self.db.execute("SELECT idpel, status FROM foto WHERE blth = ?", (blth,)))
+
+    def ringkasan(self, ids, blth):
+        """Progress daftar ID terhadap manifest: jumlah per status + byte + latency."""
+        self.flush()
+        ids = set(ids)
+        hitung = {"ok": 0, "gagal": 0, "placeholder": 0}
+        nbytes, latencies = 0, []
+        for idpel, status, nb, lat in self.db.execute(
+            "SELECT idpel, status, nbytes, latency_ms FROM foto WHERE blth = ?", (blth,)
+        ):
+            if idpel not in ids:
+                continue
+            hitung[status] = hitung.get(status, 0) + 1
+            if status == "ok":
+                nbytes += nb or 0
+                latencies.append(lat or 0)
+        latencies.sort()
+        return {
+            "total": len(ids),
+            "ok": hitung["ok"],
+            "gagal": hitung["gagal"],
+            "placeholder": hitung["placeholder"],
+            "belum": len(ids) - sum(hitung.values()),
+            "mb": round(nbytes / 1024 / 1024, 1),
+            "p50_ms": latencies[len(latencies) // 2] if latencies else 0,
+            "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+        }
+
+
+def pilih_ids(ids_all, blth, manifest, mode, output_folder):
+    """
+    Saring daftar ID sesuai mode rerun:
+      Lanjutkan        -> lewati yang sudah ok (dan file-nya masih ada) / placeholder
+      Ulang yang gagal -> hanya yang tercatat gagal
+      Semua            -> tanpa saring
+    """
+    if mode == RUN_MODES[2] or manifest is None:
+        return ids_all
+    status = manifest.status_map(blth)
+    if mode == RUN_MODES[1]:
+        return [i for i in ids_all if status.get(i) == "gagal"]
+
+    # 1x listdir, bukan os.path.exists per ID
+    try:
+        ada = {n[:-4] for n in os.listdir(output_folder) if n.endswith(".jpg")}
+    except FileNotFoundError:
+        ada = set()
+    return [i for i in ids_all
+            if not ((status.get(i) == "ok" and i in ada) or status.get(i) == "placeholder")]
 
 
 def create_folder(folder):
@@ -25,134 +578,1240 @@ def create_folder(folder):
         print(f"[ERROR] Gagal membuat folder {folder}: {e}")
 
 
-def download_image(image_id, blth, output_folder, session, base_url, failed_ids, max_retries):
-    url = f"https://{base_url}/acmt/DisplayBlobServlet1?idpel={image_id}&blth={blth}&unitup="
-    file_name = f"{image_id}.jpg"
-    file_path = os.path.join(output_folder, file_name)
+def foto_url(base_url, image_id, blth, n=0):
+    return f"https://{base_url}/acmt/DisplayBlobServlet{max(n, 1)}?idpel={image_id}&blth={blth}&unitup="
+
+
+def foto_label(image_id, blth, n=0):
+    """n=0 -> mode 1 bulan ({idpel}); n>=1 -> riwayat ({idpel}_{blth}_{n})."""
+    return image_id if n == 0 else f"{image_id}_{blth}_{n}"
+
+
+def foto_path(output_folder, image_id, blth, n=0):
+    if n == 0:
+        return os.path.join(output_folder, f"{image_id}.jpg")
+    return os.path.join(output_folder, blth, f"{foto_label(image_id, blth, n)}.jpg")
+
+
+def expand_blth(spec):
+    """'202510', '202510,202512' atau range '202508-202510' -> list BLTH (YYYYMM)."""
+    result = []
+    for v in str(spec).replace(" ", "").split(","):
+        if "-" in v:
+            a, b = v.split("-", 1)
+            y, m = int(a[:4]), int(a[4:6])
+            end = (int(b[:4]), int(b[4:6]))
+            while (y, m) <= end:
+                result.append(f"{y:04d}{m:02d}")
+                y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        elif v:
+            result.append(v)
+    return result
+
 
-    for attempt in range(1, max_retries + 1):
+def buat_jobs(ids, blths, indices=FOTO_INDEX, output_folder="2_images"):
+    """
+    Daftar job (idpel, blth, n) untuk 1 scheduler bersama. Mode 1 bulan + foto 1
+    memakai n=0 (nama lama). Mode riwayat: kombinasi yang file-nya sudah ada
+    dilewati, dicek lewat 1x listdir per folder bulan (bukan exists per file).
+    """
+    if len(blths) == 1 and list(indices) == [1]:
+        return [(i, blths[0], 0) for i in ids]
+
+    jobs = []
+    for blth in blths:
+        os.makedirs(os.path.join(output_folder, blth), exist_ok=True)
+    ada = {blth: set(os.listdir(os.path.join(output_folder, blth))) for blth in blths}
+    for blth in blths:
+        ph = os.path.join(PLACEHOLDER_DIR, blth)
+        if os.path.isdir(ph):
+            ada[blth] |= set(os.listdir(ph))
+    for image_id in ids:
+        for blth in blths:
+            for n in indices:
+                if f"{foto_label(image_id, blth, n)}.jpg" not in ada[blth]:
+                    jobs.append((image_id, blth, n))
+    return jobs
+
+
+def cek_header(response, policy):
+    """
+    Validasi status + Content-Type (requests / httpx punya atribut yang sama)
+    sebelum body dibaca. Raise FatalError / SessionExpired / RetryableError /
+    PayloadError jika tidak valid.
+    """
+    # servlet gambar tidak pernah redirect; redirect = dilempar ke halaman login
+    if 300 <= response.status_code < 400:
+        lokasi = response.headers.get("Location", "")
+        raise SessionExpired(f"Redirect {response.status_code} ke {lokasi or '?'} (sesi expired)", pasti=True)
+
+    policy.cek_status(response.status_code, response.headers.get("Retry-After"))
+
+    # HTML = halaman login / error (cookie expired?)
+    ctype = response.headers.get("Content-Type", "").lower()
+    if "text/html" in ctype:
+        raise SessionExpired("Respon HTML, bukan gambar (cookie expired?)")
+    if ctype and not (ctype.startswith("image/") or "octet-stream" in ctype):
+        raise PayloadError(f"Content-Type {ctype}, bukan gambar")
+
+
+class BlobStore:
+    """
+    Store foto per sha256: {root}/ab/abcdef....jpg. Nama foto di-hardlink ke
+    blob, jadi foto yang sama (placeholder / bulan berulang) hanya 1x di disk.
+    Jumlah referensi = st_nlink - 1, tanpa index terpisah.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        self.hardlink = None   # None = belum dicek
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.placeholders = set(KNOWN_PLACEHOLDERS)
+        ph_file = os.path.join(root, PLACEHOLDER_FILE)
+        if os.path.exists(ph_file):
+            with open(ph_file, "r") as f:
+                self.placeholders |= {line.strip().lower() for line in f if line.strip()}
+
+    @classmethod
+    def untuk(cls, root=BLOB_DIR):
+        with cls._registry_lock:
+            if root not in cls._registry:
+                cls._registry[root] = cls(root)
+            return cls._registry[root]
+
+    def blob_path(self, sha):
+        return os.path.join(self.root, sha[:2], f"{sha}.jpg")
+
+    def bisa_hardlink(self, folder):
+        """Cek 1x per store apakah blob bisa di-hardlink ke folder foto."""
+        if self.hardlink is None:
+            with self._lock:
+                if self.hardlink is None:
+                    nama = f".cek_hardlink_{os.getpid()}"
+                    src = os.path.join(self.root, nama)
+                    dst = os.path.join(folder, nama)
+                    try:
+                        open(src, "wb").close()
+                        os.link(src, dst)
+                        self.hardlink = True
+                    except OSError as e:
+                        self.hardlink = False
+                        print(f"[WARN] Hardlink {self.root} -> {folder} tidak didukung ({e}), "
+                              f"foto disimpan biasa tanpa dedup")
+                    finally:
+                        for path in (src, dst):
+                            try:
+                                os.remove(path)
+                            except OSError:
+                                pass
+        return self.hardlink
+
+    def simpan(self, tmp_path, sha, file_path, placeholder_path=None):
+        """Pindahkan tmp ke blob (jika belum ada) lalu link nama final. Return True jika placeholder."""
+        placeholder = sha in self.placeholders
+        target = placeholder_path if placeholder and placeholder_path else file_path
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
         try:
-            response = session.get(url, timeout=15, verify=False)
-            response.raise_for_status()
+            os.remove(target)
+        except FileNotFoundError:
+            pass
 
-            if len(response.content) == 0:
-                raise Exception("Isi file kosong (0 KB).")
+        if not self.bisa_hardlink(os.path.dirname(file_path) or "."):
+            # tanpa hardlink blob hanya jadi salinan kedua -> tidak dipakai
+            shutil.move(tmp_path, target)
+            return placeholder
 
-            with open(file_path, "wb") as file:
-                file.write(response.content)
+        blob = self.blob_path(sha)
+        if os.path.exists(blob):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(tmp_path, blob)
+        try:
+            os.link(blob, target)
+        except OSError:
+            shutil.copyfile(blob, target)   # mis. PLACEHOLDER_DIR di volume lain
+        return placeholder
 
-            print(f"[SUCCESS] ID {image_id} berhasil diunduh.")
-            return True
+    def statistik(self, top=5):
+        """Rasio dedup, ruang yang dihemat, dan hash dengan referensi terbanyak."""
+        physical = logical = blobs = 0
+        refs = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith(".jpg"):
+                    continue
+                st = os.stat(entry.path)
+                n = max(st.st_nlink - 1, 1)
+                blobs += 1
+                physical += st.st_size
+                logical += st.st_size * n
+                refs.append((n, entry.name[:-4], st.st_size))
+        refs.sort(reverse=True)
+        return {
+            "blobs": blobs,
+            "foto": sum(r[0] for r in refs),
+            "physical_mb": round(physical / 1024 / 1024, 1),
+            "saved_mb": round((logical - physical) / 1024 / 1024, 1),
+            "ratio": round(logical / physical, 2) if physical else 1.0,
+            "top": [r for r in refs[:top] if r[0] > 1],
+        }
 
-        except Exception as e:
-            print(f"[RETRY {attempt}/{max_retries}] ID {image_id}: {e}")
-            if attempt < max_retries:
-                time.sleep(RETRY_DELAY)
-            else:
-                print(f"[FAILED] Gagal permanen ID {image_id}.")
-                failed_ids.append(image_id)
-                return False
+
+class JpegSink:
+    """
+    Tulis body per chunk ke {file}.part sambil mencatat byte awal/akhir.
+    commit() cek SOI/EOI JPEG lalu os.replace ke nama final (atau ke BlobStore);
+    jika gagal atau keluar dari `with` tanpa commit, file .part dihapus
+    (tidak ada foto setengah jadi).
+    """
+
+    SOI = b"\xff\xd8"
+    EOI = b"\xff\xd9"
+    TAIL_BYTES = 32   # toleransi padding setelah EOI
+
+    def __init__(self, file_path, store=None, placeholder_path=None, keep=False):
+        self.file_path = file_path
+        self.tmp_path = file_path + ".part"
+        self.store = store
+        self.placeholder_path = placeholder_path
+        self.placeholder = False
+        self.head = b""
+        self.tail = b""
+        self.nbytes = 0
+        self.sha256 = hashlib.sha256()
+        self.buf = [] if keep else None   # simpan chunk untuk turunan (tanpa baca ulang file)
+        self.done = False
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.tmp_path, "wb")
+        return self
+
+    def __exit__(self, *exc):
+        if not self.done:
+            self.f.close()
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        if len(self.head) < 2:
+            self.head = (self.head + chunk)[:2]
+        self.tail = (self.tail + chunk)[-self.TAIL_BYTES:]
+        self.f.write(chunk)
+        if self.buf is not None:
+            self.buf.append(chunk)
+        self.sha256.update(chunk)
+        self.nbytes += len(chunk)
+
+    def commit(self):
+        self.f.close()
+        if self.nbytes == 0:
+            raise PayloadError("Isi file kosong (0 KB).")
+        if self.head != self.SOI:
+            raise PayloadError("Bukan JPEG (marker SOI tidak ada)")
+        if self.EOI not in self.tail:
+            raise PayloadError(f"JPEG terpotong (marker EOI tidak ada, {self.nbytes} byte)")
+        if VALIDATE_DECODE:
+            cek_decode(self.tmp_path)
+        if self.store is not None:
+            self.placeholder = self.store.simpan(
+                self.tmp_path, self.sha256.hexdigest(), self.file_path, self.placeholder_path
+            )
+        else:
+            os.replace(self.tmp_path, self.file_path)
+        self.done = True
+        return self.nbytes
+
+    def data(self):
+        return b"".join(self.buf or ())
+
+
+def cek_decode(path):
+    """Decode header saja (ukuran gambar) via Pillow; dilewati jika Pillow tidak ada."""
+    if importlib.util.find_spec("PIL") is None:
+        return
+    from PIL import Image
+    try:
+        with Image.open(path) as im:
+            w, h = im.size
+    except Exception as e:
+        raise PayloadError(f"Header gambar tidak valid: {e}")
+    if not w or not h:
+        raise PayloadError("Ukuran gambar 0")
+
+
+# =================== TURUNAN (INGEST) =================== #
+def turunan_tersedia():
+    return all(importlib.util.find_spec(m) is not None for m in ("numpy", "PIL"))
+
+
+def atur_turunan(aktif, size=None, resize=None):
+    """Set konfigurasi turunan (dipanggil GUI / CLI sebelum download)."""
+    global DERIVE, DERIVE_SIZE, DERIVE_RESIZE
+    if aktif and not turunan_tersedia():
+        print("[WARN] Turunan foto butuh numpy + pillow, dilewati")
+        aktif = False
+    DERIVE = bool(aktif)
+    if size:
+        DERIVE_SIZE = int(size)
+    if resize:
+        DERIVE_RESIZE = resize
+
+
+def turunan_path(file_path):
+    return os.path.splitext(file_path)[0] + DERIVED_EXT
+
+
+def thumb_path(file_path, output_folder):
+    return os.path.join(THUMB_DIR, os.path.relpath(file_path, output_folder))
+
+
+def _laplacian_var(gray):
+    """Sama dengan cv2.Laplacian(gray, CV_64F).var() (kernel 3x3, border reflect-101)."""
+    import numpy as np
+    p = np.pad(gray, 1, mode="reflect")
+    lap = p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:] - 4.0 * gray
+    return float(lap.var())
+
+
+def buat_turunan(data, file_path, output_folder):
+    """
+    Decode JPEG 1x dari bytes -> {file}.derived.npz (model: uint8 HxWx3 RGB,
+    brightness/contrast/blur dari grayscale resolusi penuh) + thumbnail JPEG.
+    Ditulis via file .part lalu os.replace (tidak ada turunan setengah jadi).
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    # orientasi EXIF mengikuti decoder pemakai: cv2.imread (stretch, script Excel)
+    # memutar foto sesuai EXIF, Image.open (fit, Verifikasi Fisik) tidak
+    orientasi = "exif" if DERIVE_RESIZE == "stretch" else "mentah"
+    with Image.open(io.BytesIO(data)) as im:
+        if orientasi == "exif":
+            im = ImageOps.exif_transpose(im)
+        rgb = im.convert("RGB")
+
+    # resize dibuat identik dengan preprocess script TFLITE pemakainya
+    size = (DERIVE_SIZE, DERIVE_SIZE)
+    resize = DERIVE_RESIZE
+    if DERIVE_RESIZE == "fit":
+        model = ImageOps.fit(rgb, size, Image.Resampling.LANCZOS)
+    elif importlib.util.find_spec("cv2") is not None:
+        import cv2
+        model = cv2.resize(np.asarray(rgb), size, interpolation=cv2.INTER_AREA)
+    else:
+        # BOX hanya mendekati cv2.INTER_AREA -> tag beda agar load_derived menolaknya
+        model = rgb.resize(size, Image.Resampling.BOX)
+        resize = "stretch-pil"
+
+    gray = np.asarray(rgb.convert("L"), dtype=np.float64)
+    npz_path = turunan_path(file_path)
+    with open(npz_path + ".part", "wb") as f:
+        np.savez(
+            f,
+            model=np.asarray(model, dtype=np.uint8),
+            resize=resize,
+            orientasi=orientasi,
+            src_size=np.array(rgb.size),
+            brightness=gray.mean(),
+            contrast=gray.std(),
+            blur=_laplacian_var(gray),
+        )
+    os.replace(npz_path + ".part", npz_path)
+
+    t_path = thumb_path(file_path, output_folder)
+    os.makedirs(os.path.dirname(t_path), exist_ok=True)
+    rgb.thumbnail((THUMB_PX, THUMB_PX), Image.Resampling.LANCZOS)
+    rgb.save(t_path + ".part", format="JPEG", quality=85)
+    os.replace(t_path + ".part", t_path)
+
+
+def simpan_turunan(data, file_path, output_folder, label):
+    """Turunan gagal tidak menggagalkan unduhan (foto asli tetap valid)."""
+    try:
+        buat_turunan(data, file_path, output_folder)
+    except Exception as e:
+        print(f"[WARN] Turunan ID {label} gagal dibuat: {e}")
+
+
+@contextmanager
+def _tanpa_limit():
+    yield
+
+
+@asynccontextmanager
+async def _tanpa_limit_async():
+    yield
+
+
+# =================== DOWNLOAD =================== #
+# 1 panggilan = 1 percobaan, worker tidak pernah sleep. Hasil:
+#   ("ok", nbytes, 0)      -> selesai
+#   ("gagal", 0, 0)        -> gagal permanen (fatal / retry habis)
+#   ("retry", 0, jeda)     -> masuk RetryQueue, dicoba lagi setelah `jeda` detik
+#   ("sesi", 0, 0)         -> sesi expired, job langsung diulang di sesi lain
+#   ("tunda", 0, jeda)     -> circuit breaker terbuka (belum ada request), diulang
+#                             setelah cooldown; attempt tidak bertambah
+def _hasil_error(e, image_id, blth, label, attempt, policy, breaker, base_url, manifest,
+                 http_status, latency):
+    if isinstance(e, FatalError):
+        breaker.sukses()   # server merespon, masalahnya bukan di koneksi
+        print(f"[FAILED] ID {label}: {e} (tidak di-retry)")
+        if manifest:
+            manifest.catat(image_id, blth, "gagal", 0, "", http_status, latency, attempt, str(e))
+        return ("gagal", 0, 0)
+
+    if isinstance(e, CircuitOpenError):
+        # tidak ada request yang dikirim: bukan percobaan, tunggu cooldown selesai
+        # (min. base_delay, selama 1 request percobaan half-open masih berjalan)
+        return ("tunda", 0, max(breaker.sisa(), policy.base_delay))
+
+    retry_after = getattr(e, "retry_after", None)
+    if breaker.gagal():
+        print(f"[WARN] {base_url} gagal {breaker.failures}x beruntun, "
+              f"diistirahatkan {breaker.cooldown:.0f} dtk")
+
+    if attempt < policy.max_retry:
+        jeda = policy.delay(attempt, retry_after)
+        print(f"[RETRY {attempt}/{policy.max_retry}] ID {label}: {e} (antre ulang {jeda:.1f} dtk)")
+        return ("retry", 0, jeda)
+
+    print(f"[FAILED] Gagal permanen ID {label}: {e}")
+    if manifest:
+        manifest.catat(image_id, blth, "gagal", 0, "", http_status, latency, attempt, str(e) or repr(e))
+    return ("gagal", 0, 0)
+
+
+def download_image(image_id, blth, output_folder, sessions, base_url, attempt, max_retries,
+                   manifest=None, n=0, limiter=None):
+    """1 percobaan download 1 foto (tanpa sleep). Return (status, nbytes, jeda)."""
+    url = foto_url(base_url, image_id, blth, n)
+    file_path = foto_path(output_folder, image_id, blth, n)
+    label = foto_label(image_id, blth, n)
+    store = BlobStore.untuk(BLOB_DIR) if CONTENT_STORE else None
+    ph_path = foto_path(PLACEHOLDER_DIR, image_id, blth, n)
+
+    policy = RetryPolicy(max_retries)
+    breaker = CircuitBreaker.untuk(base_url)
+
+    http_status, sesi = None, None
+    t0 = time.perf_counter()
+    try:
+        sesi = sessions.ambil()
+        if not breaker.allow():
+            raise CircuitOpenError(f"server {base_url} diistirahatkan ({breaker.sisa():.0f} dtk lagi)")
+
+        with limiter.slot() if limiter else _tanpa_limit():
+            with sesi["klien"].get(url, timeout=REQUEST_TIMEOUT, verify=False, stream=True,
+                                   allow_redirects=False) as response:
+                http_status = response.status_code
+                cek_header(response, policy)
+                with JpegSink(file_path, store, ph_path, keep=DERIVE) as sink:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        sink.write(chunk)
+                    nbytes = sink.commit()
+
+    except SessionExpired as e:
+        breaker.sukses()   # server merespon normal
+        if sessions.expired(sesi, e):
+            return ("sesi", 0, 0)   # ulang di sesi lain, attempt tidak bertambah
+        if sessions.aktif() > 1 and attempt < policy.max_retry + sessions.strikes:
+            return ("retry", 0, 0)  # HTML tunggal: coba langsung di sesi berikutnya
+        return _hasil_error(FatalError(str(e)), image_id, blth, label, attempt, policy, breaker,
+                            base_url, manifest, http_status, time.perf_counter() - t0)
+    except Exception as e:
+        return _hasil_error(e, image_id, blth, label, attempt, policy, breaker, base_url, manifest,
+                            http_status, time.perf_counter() - t0)
+
+    sessions.sukses(sesi)
+    breaker.sukses()
+    status = "placeholder" if sink.placeholder else "ok"
+    print(f"[{'PLACEHOLDER' if sink.placeholder else 'SUCCESS'}] ID {label} berhasil diunduh.")
+    if manifest:
+        manifest.catat(image_id, blth, status, nbytes, sink.sha256.hexdigest(),
+                       http_status, time.perf_counter() - t0, attempt)
+    if sink.buf is not None and not sink.placeholder:
+        simpan_turunan(sink.data(), file_path, output_folder, label)
+    return ("ok", nbytes, 0)
+
+
+async def download_image_async(image_id, blth, output_folder, sessions, base_url, attempt, max_retries,
+                               manifest=None, n=0, limiter=None):
+    """Versi async download_image (httpx.AsyncClient)."""
+    url = foto_url(base_url, image_id, blth, n)
+    file_path = foto_path(output_folder, image_id, blth, n)
+    label = foto_label(image_id, blth, n)
+    store = BlobStore.untuk(BLOB_DIR) if CONTENT_STORE else None
+    ph_path = foto_path(PLACEHOLDER_DIR, image_id, blth, n)
+
+    policy = RetryPolicy(max_retries)
+    breaker = CircuitBreaker.untuk(base_url)
+
+    http_status, sesi = None, None
+    t0 = time.perf_counter()
+    try:
+        sesi = sessions.ambil()
+        if not breaker.allow():
+            raise CircuitOpenError(f"server {base_url} diistirahatkan ({breaker.sisa():.0f} dtk lagi)")
+
+        async with limiter.slot_async() if limiter else _tanpa_limit_async():
+            async with sesi["klien"].stream("GET", url) as response:
+                http_status = response.status_code
+                cek_header(response, policy)
+                with JpegSink(file_path, store, ph_path, keep=DERIVE) as sink:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        sink.write(chunk)
+                    nbytes = sink.commit()
+
+    except asyncio.CancelledError:
+        breaker.batal()   # task dibatalkan: jangan kunci breaker di half-open
+        raise
+    except SessionExpired as e:
+        breaker.sukses()   # server merespon normal
+        if sessions.expired(sesi, e):
+            return ("sesi", 0, 0)   # ulang di sesi lain, attempt tidak bertambah
+        if sessions.aktif() > 1 and attempt < policy.max_retry + sessions.strikes:
+            return ("retry", 0, 0)  # HTML tunggal: coba langsung di sesi berikutnya
+        return _hasil_error(FatalError(str(e)), image_id, blth, label, attempt, policy, breaker,
+                            base_url, manifest, http_status, time.perf_counter() - t0)
+    except Exception as e:
+        return _hasil_error(e, image_id, blth, label, attempt, policy, breaker, base_url, manifest,
+                            http_status, time.perf_counter() - t0)
+
+    sessions.sukses(sesi)
+    breaker.sukses()
+    status = "placeholder" if sink.placeholder else "ok"
+    print(f"[{'PLACEHOLDER' if sink.placeholder else 'SUCCESS'}] ID {label} berhasil diunduh.")
+    if manifest:
+        manifest.catat(image_id, blth, status, nbytes, sink.sha256.hexdigest(),
+                       http_status, time.perf_counter() - t0, attempt)
+    if sink.buf is not None and not sink.placeholder:
+        # decode = kerja CPU, jangan menahan event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, simpan_turunan, sink.data(), file_path, output_folder, label
+        )
+    return ("ok", nbytes, 0)
+
+
+def lapor_progress(pump, meter, limiter, retry):
+    """Kirim event progress: (persen, teks untuk GUI, dict untuk CLI/JSON)."""
+    total = meter.total
+    percent = int((meter.items / total) * 100) if total else 0
+    text = (f"Progress: {percent}% ({meter.items}/{total}) | "
+            f"{meter.teks()} | {limiter.teks()} | antre retry {len(retry)}")
+    info = {**meter.info(), **limiter.info(), "percent": percent, "retry": len(retry)}
+    pump.emit("progress", (percent, text, info))
+
+
+class RetryQueue:
+    """
+    Antrean retry berurut deadline (heap). Job gagal tidak ditunggu di worker,
+    tapi dijadwalkan ulang dan diselingi dengan job baru oleh scheduler.
+    Hanya dipakai dari 1 thread (scheduler THREAD / event loop ASYNC).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def tambah(self, job, attempt, jeda):
+        self._seq += 1
+        heapq.heappush(self._heap, (time.monotonic() + jeda, self._seq, job, attempt))
+
+    def siap(self):
+        """Ambil (job, attempt) yang deadline-nya sudah lewat, atau None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, job, attempt = heapq.heappop(self._heap)
+            return job, attempt
+        return None
+
+    def tunggu(self):
+        """Detik sampai retry berikutnya jatuh tempo (None jika kosong)."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
 
 
 def download_images_with_progress(
-    ids, blth, output_folder, session, base_url,
-    progress_var, label_var, root,
-    failed_ids, max_retries,
-    max_threads=10
+    jobs, output_folder, sessions, base_url,
+    pump,
+    max_retries,
+    max_threads=10, manifest=None
 ):
-    total = len(ids)
-    done = 0
-
-    def ui_update(percent, text):
-        root.after(0, progress_var.set, percent)
-        root.after(0, label_var.set, text)
+    """
+    jobs = list (idpel, blth, n) dari buat_jobs(); max_threads = batas atas AIMD.
+    Return list label yang gagal permanen.
+    """
+    total = len(jobs)
+    meter = Throughput(total)
+    limiter = AdaptiveLimiter(start=min(THREAD_WORKERS, max_threads), max_conc=max_threads)
+    retry = RetryQueue()
+    failed = []
 
     if total == 0:
-        ui_update(0, "Progress: 0% (0/0)")
-        return
+        pump.emit("progress", (0, "Progress: 0% (0/0)", {"done": 0, "total": 0, "percent": 0}))
+        return failed
 
+    # submit bertahap (maks 4x thread yang antre) agar memory tetap kecil;
+    # retry yang sudah jatuh tempo didahulukan dari job baru
+    fresh = iter(jobs)
+    pending = {}
     with ThreadPoolExecutor(max_threads) as executor:
-        futures = {
-            executor.submit(
-                download_image, image_id, blth, output_folder,
-                session, base_url, failed_ids, max_retries
-            ): image_id
-            for image_id in ids
-        }
+        while True:
+            while len(pending) < max_threads * 4:
+                item = retry.siap()
+                if item is None:
+                    job = next(fresh, None)
+                    if job is None:
+                        break
+                    item = (job, 1)
+                (image_id, blth, n), attempt = item
+                fut = executor.submit(
+                    download_image, image_id, blth, output_folder,
+                    sessions, base_url, attempt, max_retries, manifest, n, limiter
+                )
+                pending[fut] = item
 
-        for _ in as_completed(futures):
-            done += 1
-            percent = int((done / total) * 100)
-            ui_update(percent, f"Progress: {percent}% ({done}/{total})")
+            if not pending:
+                if not len(retry):
+                    break
+                time.sleep(retry.tunggu())   # hanya thread scheduler yang menunggu
+                continue
 
+            done, _ = wait(pending, timeout=retry.tunggu(), return_when=FIRST_COMPLETED)
+            for fut in done:
+                job, attempt = pending.pop(fut)
+                status, nbytes, jeda = fut.result()
+                if status == "retry":
+                    retry.tambah(job, attempt + 1, jeda)
+                    continue
+                if status in ("sesi", "tunda"):
+                    retry.tambah(job, attempt, jeda)
+                    continue
+                if status == "gagal":
+                    failed.append(foto_label(*job))
+                meter.tambah(1, nbytes)
 
-def main(thbl, cookie, input_file, base_url, progress_var, label_var, root, max_retries, limit_size):
-    failed_ids = []
-    try:
-        with open(input_file, "r") as file:
-            ids_all = [line.strip() for line in file if line.strip()]
+            # 1 event per batch selesai ke queue; GUI hanya menampilkan event terakhir
+            lapor_progress(pump, meter, limiter, retry)
+    return failed
 
-        # Batasi jumlah ID yang didownload (misal 5000 pertama)
-        if limit_size and limit_size > 0:
-            ids = ids_all[:limit_size]
+
+def async_tersedia():
+    return importlib.util.find_spec("httpx") is not None
+
+
+def http2_tersedia():
+    return importlib.util.find_spec("h2") is not None
+
+
+async def _download_async(jobs, output_folder, headers_list, base_url, pump,
+                          max_retries, concurrency, http2, manifest):
+    import httpx
+
+    total = len(jobs)
+    meter = Throughput(total)
+    limiter = AdaptiveLimiter(start=max(AIMD_MIN, concurrency // 4), max_conc=concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    retry = RetryQueue()
+    failed = []
+
+    # `concurrency` worker coroutine menarik ID dari 1 iterator: jumlah task
+    # dan respon di memory tetap <= concurrency walau daftar ID 100rb+
+    fresh = iter(jobs)
+    sisa = [total]
+
+    # 1 AsyncClient per cookie; pool tiap client = batas concurrency (koneksi
+    # dibuka sesuai kebutuhan, jadi sisa client tetap cukup jika ada yang expired)
+    async with AsyncExitStack() as stack:
+        clients = [
+            await stack.enter_async_context(httpx.AsyncClient(
+                headers=headers, verify=False, http2=http2, limits=limits,
+                timeout=REQUEST_TIMEOUT, follow_redirects=False,
+            ))
+            for headers in headers_list
+        ]
+        sessions = SessionPool(clients)
+
+        async def worker():
+            while sisa[0] > 0:
+                item = retry.siap()
+                if item is None:
+                    job = next(fresh, None)
+                    if job is None:
+                        # tinggal retry yang belum jatuh tempo / sedang dikerjakan worker lain
+                        await asyncio.sleep(min(retry.tunggu() or 0.05, 0.2))
+                        continue
+                    item = (job, 1)
+                (image_id, blth, n), attempt = item
+                status, nbytes, jeda = await download_image_async(
+                    image_id, blth, output_folder, sessions, base_url, attempt, max_retries,
+                    manifest, n, limiter
+                )
+                if status == "retry":
+                    retry.tambah(item[0], attempt + 1, jeda)
+                    continue
+                if status in ("sesi", "tunda"):
+                    retry.tambah(item[0], attempt, jeda)
+                    continue
+                if status == "gagal":
+                    failed.append(foto_label(image_id, blth, n))
+                sisa[0] -= 1
+                meter.tambah(1, nbytes)
+                lapor_progress(pump, meter, limiter, retry)
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return failed
+
+
+def download_images_async(
+    jobs, output_folder, headers_list, base_url,
+    pump,
+    max_retries,
+    concurrency=ASYNC_CONCURRENCY, http2=False, manifest=None
+):
+    """Pengganti download_images_with_progress berbasis asyncio + httpx."""
+    if not jobs:
+        pump.emit("progress", (0, "Progress: 0% (0/0)", {"done": 0, "total": 0, "percent": 0}))
+        return []
+    if http2 and not http2_tersedia():
+        print('[WARN] Paket h2 tidak ada (pip install "httpx[http2]"), pakai HTTP/1.1')
+        http2 = False
+    print(f"[INFO] Engine ASYNC: maks {concurrency} request paralel (AIMD), HTTP/{'2' if http2 else '1.1'}")
+    return asyncio.run(_download_async(
+        jobs, output_folder, headers_list, base_url, pump,
+        max_retries, max(1, concurrency), http2, manifest,
+    ))
+
+
+def unduh_jobs(jobs, cookie, base_url, pump, max_retries, engine="THREAD",
+               concurrency=ASYNC_CONCURRENCY, http2=False, manifest=None, output_folder="2_images"):
+    """
+    Jalankan jobs dengan engine terpilih. `cookie` boleh berisi beberapa cookie
+    (baris baru / "||") -> 1 sesi per cookie. Return list label yang gagal permanen.
+    """
+    headers_list = [buat_headers(base_url, c) for c in pisah_cookie(cookie)]
+    if not headers_list:
+        raise InputError("Cookie kosong")
+    print(f"[INFO] {len(headers_list)} sesi cookie dalam rotasi")
+
+    if engine == "ASYNC" and not async_tersedia():
+        print("[WARN] httpx belum terpasang (pip install httpx), kembali ke engine THREAD")
+        engine = "THREAD"
+
+    if engine == "ASYNC":
+        failed = download_images_async(
+            jobs, output_folder, headers_list, base_url,
+            pump,
+            max_retries,
+            concurrency=concurrency, http2=http2, manifest=manifest
+        )
+    else:
+        # pool koneksi default requests = 10; tiap sesi disamakan dengan batas
+        # thread (koneksi dibuka sesuai kebutuhan) agar tetap cukup jika sesi lain expired
+        klien = []
+        for headers in headers_list:
+            session = requests.Session()
+            session.headers.update(headers)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=THREAD_MAX)
+            session.mount("https://", adapter)
+            klien.append(session)
+        failed = download_images_with_progress(
+            jobs, output_folder, SessionPool(klien), base_url,
+            pump,
+            max_retries,
+            max_threads=THREAD_MAX, manifest=manifest
+        )
+    if manifest is not None:
+        manifest.flush()
+    if CONTENT_STORE:
+        store = BlobStore.untuk(BLOB_DIR)
+        if store.hardlink is False:
+            print("[INFO] Store foto nonaktif (FS tanpa hardlink), foto disimpan biasa")
         else:
-            ids = ids_all
+            st = store.statistik(top=0)
+            print(f"[INFO] Store foto: {st['foto']} foto -> {st['blobs']} blob, "
+                  f"dedup {st['ratio']}x, hemat {st['saved_mb']} MB")
+    return failed
 
-        if not ids:
-            messagebox.showerror("Error", "File IDPEL kosong atau tidak ada ID valid.")
-            return
 
-        output_folder = "2_images"
-        create_folder(output_folder)
+# =================== API =================== #
+class InputError(Exception):
+    """Input tidak valid (file IDPEL kosong, THBL salah, dll.)."""
 
-        log_folder = "4_log_gagal_unduh_foto"
-        create_folder(log_folder)
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Connection": "keep-alive",
-            "Referer": f"https://{base_url}/acmt/Main.html",
-            "Cookie": cookie,
-        }
+def download_foto(thbl, cookie, input_file, base_url, pump, max_retries=DEFAULT_RETRIES, limit_size=0,
+                  engine="THREAD", concurrency=ASYNC_CONCURRENCY, http2=False,
+                  run_mode=RUN_MODES[0], manifest_path=MANIFEST_DB, foto_index=FOTO_INDEX):
+    """
+    Engine download tanpa Tk (dipakai GUI, CLI, dan shard paralel).
+    pump cukup punya .emit(kind, payload). Return dict ringkasan:
+    {file, total_id, foto, ok, gagal, failed_file}.
+    Raise FileNotFoundError / InputError untuk input yang salah.
+    """
+    with open(input_file, "r") as file:
+        ids_all = [line.strip() for line in file if line.strip()]
+
+    if not ids_all:
+        raise InputError("File IDPEL kosong atau tidak ada ID valid.")
+
+    blths = expand_blth(thbl)
+    if not blths or not all(len(b) == 6 and b.isdigit() for b in blths):
+        raise InputError(f"THBL tidak valid: {thbl!r} (contoh 202510 atau 202508-202510)")
+
+    output_folder = "2_images"
+    create_folder(output_folder)
+
+    log_folder = LOG_FOLDER
+    create_folder(log_folder)
+
+    hasil = {"file": input_file, "total_id": len(ids_all), "foto": 0, "ok": 0, "gagal": 0, "failed_file": ""}
+    riwayat = len(blths) > 1 or list(foto_index) != [1]
+    manifest = None
+    try:
+        if riwayat:
+            # Riwayat: yang sudah ada dilewati per file di buat_jobs()
+            ids_sisa = ids_all
+            print(f"[INFO] Mode riwayat: {len(blths)} bulan ({blths[0]}..{blths[-1]}) x foto {list(foto_index)}")
+        else:
+            # Manifest: lewati yang sudah selesai, limit dihitung dari sisa (cursor)
+            manifest = DownloadManifest(manifest_path)
+            ids_sisa = pilih_ids(ids_all, blths[0], manifest, run_mode, output_folder)
+            print(f"[INFO] Mode {run_mode}: {len(ids_all) - len(ids_sisa)} ID dilewati (manifest {manifest_path})")
+
+        # Batasi jumlah ID yang didownload (misal 5000 berikutnya)
+        if limit_size and limit_size > 0:
+            ids = ids_sisa[:limit_size]
+        else:
+            ids = ids_sisa
 
-        session = requests.Session()
-        session.headers.update(headers)
+        jobs = buat_jobs(ids, blths, foto_index, output_folder)
+        if not jobs:
+            return hasil
 
         # info limit
         if limit_size and limit_size > 0:
-            print(f"[INFO] Total ID di file: {len(ids_all)} | Akan didownload: {len(ids)} (limit {limit_size})")
+            print(f"[INFO] Total ID di file: {len(ids_all)} | Sisa: {len(ids_sisa)} | "
+                  f"Akan didownload: {len(ids)} (limit {limit_size})")
         else:
-            print(f"[INFO] Total ID di file: {len(ids_all)} | Akan didownload semua: {len(ids)}")
+            print(f"[INFO] Total ID di file: {len(ids_all)} | Akan didownload semua sisa: {len(ids)}")
+        if riwayat:
+            print(f"[INFO] {len(jobs)} foto belum ada dari {len(ids) * len(blths) * len(foto_index)} kombinasi")
 
-        download_images_with_progress(
-            ids, thbl, output_folder, session, base_url,
-            progress_var, label_var, root,
-            failed_ids, max_retries,
-            max_threads=10
-        )
+        failed_ids = unduh_jobs(jobs, cookie, base_url, pump, max_retries, engine,
+                                concurrency, http2, manifest, output_folder)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    hasil.update(foto=len(jobs), ok=len(jobs) - len(failed_ids), gagal=len(failed_ids))
+
+    # tulis log gagal
+    if failed_ids:
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        failed_file = os.path.join(log_folder, f"failed_ids_{base_name}.txt")
 
-        # tulis log gagal
-        if failed_ids:
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            failed_file = os.path.join(log_folder, f"failed_ids_{base_name}.txt")
+        with open(failed_file, "w") as f:
+            for fid in failed_ids:
+                f.write(f"{fid}\n")
+        hasil["failed_file"] = failed_file
+    return hasil
 
-            with open(failed_file, "w") as f:
-                for fid in failed_ids:
-                    f.write(f"{fid}\n")
 
-            messagebox.showwarning(
+def main(thbl, cookie, input_file, base_url, pump, max_retries, limit_size,
+         engine="THREAD", concurrency=ASYNC_CONCURRENCY, http2=False,
+         run_mode=RUN_MODES[0], manifest_path=MANIFEST_DB, foto_index=FOTO_INDEX):
+    """Versi GUI: jalankan download_foto() lalu tampilkan hasil lewat messagebox."""
+    try:
+        hasil = download_foto(thbl, cookie, input_file, base_url, pump, max_retries, limit_size,
+                              engine, concurrency, http2, run_mode, manifest_path, foto_index)
+
+        if not hasil["foto"]:
+            pump.call(messagebox.showinfo, "Selesai", f"Tidak ada foto tersisa untuk mode '{run_mode}'.")
+        elif hasil["gagal"]:
+            pump.call(
+                messagebox.showwarning,
                 "Selesai",
-                f"Selesai download {len(ids)} ID.\n"
-                f"Ada {len(failed_ids)} ID gagal.\nLihat:\n{failed_file}"
+                f"Selesai download {hasil['foto']} foto.\n"
+                f"Ada {hasil['gagal']} ID gagal.\nLihat:\n{hasil['failed_file']}"
             )
         else:
-            messagebox.showinfo("Selesai", f"Selesai! Berhasil download {len(ids)} ID tanpa gagal.")
+            pump.call(messagebox.showinfo, "Selesai", f"Selesai! Berhasil download {hasil['foto']} foto tanpa gagal.")
 
     except FileNotFoundError:
-        messagebox.showerror("Error", f"File {input_file} tidak ditemukan.")
+        pump.call(messagebox.showerror, "Error", f"File {input_file} tidak ditemukan.")
+    except InputError as e:
+        pump.call(messagebox.showerror, "Error", str(e))
     except Exception as e:
-        messagebox.showerror("Error", f"Terjadi kesalahan: {e}")
+        pump.call(messagebox.showerror, "Error", f"Terjadi kesalahan: {e}")
+
+
+def baca_failed_files(files, thbl):
+    """
+    Gabungkan failed_ids_*.txt -> jobs (idpel, blth, n) unik. Baris {idpel}
+    memakai `thbl`; baris {idpel}_{blth}_{n} (mode riwayat) dipakai apa adanya.
+    """
+    jobs, seen = [], set()
+    for path in files:
+        with open(path, "r") as f:
+            for line in f:
+                label = line.strip()
+                if not label:
+                    continue
+                parts = label.split("_")
+                if len(parts) == 3:
+                    job = (parts[0], parts[1], int(parts[2]))
+                elif thbl:
+                    job = (label, thbl, 0)
+                else:
+                    print(f"[WARN] {path}: '{label}' butuh --thbl, dilewati")
+                    continue
+                if job not in seen:
+                    seen.add(job)
+                    jobs.append(job)
+    return jobs
+
+
+def retry_failed(files, thbl, cookie, base_url, pump, max_retries, engine="THREAD",
+                 concurrency=ASYNC_CONCURRENCY, http2=False, manifest_path=MANIFEST_DB):
+    """
+    Unduh ulang isi file failed_ids_*.txt. Setelah selesai, tiap file ditulis
+    ulang hanya berisi yang masih gagal (dihapus jika semua berhasil).
+    Return jumlah yang masih gagal.
+    """
+    jobs = baca_failed_files(files, thbl)
+    print(f"[INFO] Retry {len(jobs)} foto dari {len(files)} file gagal")
+    if not jobs:
+        return 0
+    for _, blth, n in jobs:
+        if n:
+            os.makedirs(os.path.join("2_images", blth), exist_ok=True)
+
+    manifest = DownloadManifest(manifest_path)
+    try:
+        masih_gagal = set(unduh_jobs(jobs, cookie, base_url, pump, max_retries, engine,
+                                     concurrency, http2, manifest))
+    finally:
+        manifest.close()
+
+    for path in files:
+        with open(path, "r") as f:
+            labels = [line.strip() for line in f if line.strip()]
+        sisa = [x for x in labels if x in masih_gagal]
+        if sisa:
+            with open(path, "w") as f:
+                f.write("".join(f"{x}\n" for x in sisa))
+        else:
+            os.remove(path)
+    print(f"[INFO] Retry selesai: {len(jobs) - len(masih_gagal)} berhasil, {len(masih_gagal)} masih gagal")
+    return len(masih_gagal)
+
+
+# =================== CLI =================== #
+# Exit code: 0 = semua berhasil, 1 = ada foto gagal, 2 = input / error fatal
+def parse_args(argv=None):
+    p = argparse.ArgumentParser("Downloader Foto ACMT (tanpa argumen = GUI)")
+    p.add_argument("--file", nargs="+",
+                   help="File IDPEL (1 ID per baris); beberapa file shard dijalankan paralel")
+    p.add_argument("--thbl", help="THBL / BLTH: 202510, 202510,202512 atau range 202508-202510")
+    p.add_argument("--cookie", action="append",
+                   help="Cookie sesi ACMT; boleh diulang untuk beberapa sesi")
+    p.add_argument("--cookie-file",
+                   help="File cookie, 1 cookie per baris (agar tidak tampil di daftar proses)")
+    p.add_argument("--server", default="INTERNET",
+                   help=f"{' / '.join(SERVERS)} atau host langsung (default INTERNET)")
+    p.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    p.add_argument("--limit", type=int, default=0, help="Maks ID per file (0 = semua sisa)")
+    p.add_argument("--mode", choices=["lanjut", "gagal", "semua"], default="lanjut",
+                   help="lanjut = lewati yang sudah ok, gagal = ulang yang gagal, semua = abaikan manifest")
+    p.add_argument("--foto", default="1", help="Nomor foto per bulan, misal 1 atau 1,2,3")
+    p.add_argument("--engine", choices=ENGINES, default="THREAD")
+    p.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY)
+    p.add_argument("--http2", action="store_true")
+    p.add_argument("--parallel", type=int, default=0,
+                   help="Jumlah file shard yang jalan bersamaan (default = jumlah file, maks 4)")
+    p.add_argument("--manifest", default=MANIFEST_DB)
+    p.add_argument("--status", action="store_true",
+                   help="Tampilkan progress file IDPEL terhadap manifest lalu keluar")
+    p.add_argument("--store-stats", action="store_true",
+                   help=f"Tampilkan rasio dedup dan ruang yang dihemat di {BLOB_DIR}")
+    p.add_argument("--retry-failed", nargs="*", metavar="FILE",
+                   help=f"Unduh ulang failed_ids_*.txt (default semua di {LOG_FOLDER})")
+    p.add_argument("--derive", action="store_true",
+                   help=f"Buat turunan ({DERIVED_EXT} + thumbnail di {THUMB_DIR}) saat foto diunduh")
+    p.add_argument("--derive-size", type=int, default=DERIVE_SIZE, help="Ukuran input model (px)")
+    p.add_argument("--derive-resize", choices=DERIVE_MODES, default=DERIVE_RESIZE)
+    return p.parse_args(argv)
+
+
+class ConsolePump:
+    """Pengganti UiPump tanpa Tk: progress dicetak maks 1x per detik."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = 0.0
+
+    def emit(self, kind, payload=None):
+        if kind == "progress":
+            now = time.monotonic()
+            if now - self._last >= self.interval or payload[0] >= 100:
+                self._last = now
+                print(f"[PROGRESS] {payload[1]}", flush=True)
+
+    def call(self, fn, *args):
+        """messagebox.showX(judul, pesan) -> dicetak ke console."""
+        judul, *pesan = args or ("INFO",)
+        print(f"[{judul}] " + " ".join(str(p).replace("\n", " ") for p in pesan))
+
+
+class JsonPump:
+    """
+    Event -> 1 baris JSON di `out` (stdout asli), aman dari banyak thread.
+    Progress dibatasi maks 1x per `interval` detik per file.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, out, tag="", interval=1.0):
+        self.out = out
+        self.tag = tag
+        self.interval = interval
+        self._last = 0.0
+
+    def event(self, kind, **data):
+        line = json.dumps({"event": kind, "file": self.tag, "ts": round(time.time(), 3), **data})
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def emit(self, kind, payload=None):
+        if kind != "progress":
+            return
+        now = time.monotonic()
+        percent, _, info = payload
+        if now - self._last >= self.interval or percent >= 100:
+            self._last = now
+            self.event("progress", **info)
+
+    def call(self, fn, *args):
+        judul, *pesan = args or ("INFO",)
+        self.event("message", title=judul, text=" ".join(str(p) for p in pesan))
+
+
+def baca_cookie(args):
+    """Gabungkan --cookie (boleh berulang) + --cookie-file -> 1 string per baris."""
+    cookies = list(args.cookie or [])
+    if args.cookie_file:
+        with open(args.cookie_file, "r") as f:
+            cookies += f.read().splitlines()
+    return "\n".join(c.strip() for c in cookies if c.strip())
+
+
+def cli_download(args, cookie, out):
+    """Jalankan 1+ file IDPEL (paralel per file), event JSON-lines ke `out`."""
+    base_url = SERVERS.get(args.server.upper(), args.server)
+    run_mode = {"lanjut": RUN_MODES[0], "gagal": RUN_MODES[1], "semua": RUN_MODES[2]}[args.mode]
+    try:
+        foto_index = [int(x) for x in args.foto.replace(" ", "").split(",") if x] or FOTO_INDEX
+    except ValueError:
+        JsonPump(out).event("error", error=f"--foto tidak valid: {args.foto!r}")
+        return 2
+    parallel = args.parallel or min(len(args.file), 4)
+
+    def satu(input_file):
+        pump = JsonPump(out, input_file)
+        pump.event("start", thbl=args.thbl, server=base_url, engine=args.engine)
+        try:
+            hasil = download_foto(args.thbl, cookie, input_file, base_url, pump, args.retries, args.limit,
+                                  args.engine, args.concurrency, args.http2, run_mode,
+                                  args.manifest, foto_index)
+        except (FileNotFoundError, InputError) as e:
+            pump.event("error", error=str(e))
+            return 2
+        except Exception as e:
+            pump.event("error", error=f"{type(e).__name__}: {e}")
+            return 2
+        pump.event("done", **{k: v for k, v in hasil.items() if k != "file"})
+        return 1 if hasil["gagal"] else 0
+
+    with ThreadPoolExecutor(max(1, parallel)) as ex:
+        codes = list(ex.map(satu, args.file))
+    return max(codes)
+
+
+def cli_status(input_file, thbl, manifest_path=MANIFEST_DB):
+    with open(input_file, "r") as file:
+        ids = [line.strip() for line in file if line.strip()]
+    manifest = DownloadManifest(manifest_path)
+    try:
+        r = manifest.ringkasan(ids, thbl)
+    finally:
+        manifest.close()
+    pct = r["ok"] / r["total"] * 100 if r["total"] else 0
+    print(f"File     : {input_file} (BLTH {thbl})")
+    print(f"Total ID : {r['total']:,}")
+    print(f"Selesai  : {r['ok']:,} ({pct:.1f}%) | {r['mb']} MB | latency p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms")
+    print(f"Placeh.  : {r['placeholder']:,}")
+    print(f"Gagal    : {r['gagal']:,}")
+    print(f"Belum    : {r['belum']:,}")
+    return 0
+
+
+def cli_store_stats(root=BLOB_DIR):
+    st = BlobStore.untuk(root).statistik()
+    print(f"Store    : {root}")
+    print(f"Foto     : {st['foto']:,} -> {st['blobs']:,} blob unik ({st['physical_mb']} MB di disk)")
+    print(f"Dedup    : {st['ratio']}x | hemat {st['saved_mb']} MB")
+    for n, sha, size in st["top"]:
+        print(f"  {n:>6}x {sha} ({size / 1024:.0f} KB)  <- kandidat placeholder?")
+    print(f"Placeholder dikenal: {len(BlobStore.untuk(root).placeholders)} (tambah di {os.path.join(root, PLACEHOLDER_FILE)})")
+    return 0
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    if args.store_stats:
+        return cli_store_stats()
+    if args.status:
+        if not args.file or not args.thbl:
+            print("[ERROR] --status butuh --file dan --thbl")
+            return 2
+        return max(cli_status(f, args.thbl, args.manifest) for f in args.file)
+
+    cookie = baca_cookie(args)
+    if not cookie:
+        print("[ERROR] Butuh --cookie atau --cookie-file")
+        return 2
+    if args.derive:
+        atur_turunan(True, args.derive_size, args.derive_resize)
+
+    if args.retry_failed is not None:
+        files = args.retry_failed
+        if not files and os.path.isdir(LOG_FOLDER):
+            files = sorted(
+                os.path.join(LOG_FOLDER, f) for f in os.listdir(LOG_FOLDER)
+                if f.startswith("failed_ids_") and f.endswith(".txt")
+            )
+        base_url = SERVERS.get(args.server.upper(), args.server)
+        sisa = retry_failed(files, args.thbl, cookie, base_url, ConsolePump(),
+                            args.retries, args.engine, args.concurrency, args.http2, args.manifest)
+        return 1 if sisa else 0
+
+    if not args.file or not args.thbl:
+        print("[ERROR] Butuh --file dan --thbl (atau --status / --store-stats / --retry-failed)")
+        return 2
+
+    # stdout khusus JSON-lines; log [INFO]/[SUCCESS] dialihkan ke stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        return cli_download(args, cookie, out)
+    finally:
+        sys.stdout = out
+
+
+# =================== UI PUMP =================== #
+# UiPump sama dengan downloader DLPD ACMT; Throughput versi foto
+# (foto/dtk tanpa baris/dtk, + info() untuk progress JSON-lines CLI)
+class UiPump:
+    """
+    Thread worker hanya memasukkan event ke queue (thread-safe); Tk thread
+    menguras queue per batch tiap interval_ms, jadi widget di-update sekali
+    per batch, bukan sekali per baris log / per item.
+    Handler menerima list payload dari 1 batch.
+    """
+
+    def __init__(self, root, interval_ms=100, max_batch=5000):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.q = queue.SimpleQueue()
+        self.handlers = {"call": self._call}
+
+    def on(self, kind, fn):
+        self.handlers[kind] = fn
+
+    def emit(self, kind, payload=None):
+        self.q.put((kind, payload))
+
+    def call(self, fn, *args):
+        """Jalankan fn(*args) di Tk thread (mis. messagebox dari worker)."""
+        self.emit("call", (fn, args))
+
+    def start(self):
+        self.root.after(self.interval_ms, self._drain)
+
+    def _drain(self):
+        batch = {}
+        try:
+            for _ in range(self.max_batch):
+                kind, payload = self.q.get_nowait()
+                batch.setdefault(kind, []).append(payload)
+        except queue.Empty:
+            pass
+        for kind, payloads in batch.items():
+            try:
+                self.handlers[kind](payloads)
+            except Exception as e:
+                print(f"[UI] {kind}: {e}")
+        self.root.after(self.interval_ms, self._drain)
+
+    @staticmethod
+    def _call(payloads):
+        for fn, args in payloads:
+            fn(*args)
+
+
+class Throughput:
+    """Laju (foto/dtk, MB/dtk) + ETA berdasarkan item selesai vs total."""
+
+    def __init__(self, total=0):
+        self.t0 = time.perf_counter()
+        self.total = total
+        self.items = 0
+        self.nbytes = 0
+
+    def tambah(self, items=0, nbytes=0):
+        self.items += items
+        self.nbytes += nbytes
+
+    def info(self):
+        elapsed = max(time.perf_counter() - self.t0, 1e-6)
+        eta = int(elapsed / self.items * (self.total - self.items)) if self.items else None
+        return {
+            "done": self.items,
+            "total": self.total,
+            "mb": round(self.nbytes / 1024 / 1024, 2),
+            "foto_per_dtk": round(self.items / elapsed, 2),
+            "mb_per_dtk": round(self.nbytes / 1024 / 1024 / elapsed, 3),
+            "eta_dtk": eta,
+        }
+
+    def teks(self):
+        elapsed = max(time.perf_counter() - self.t0, 1e-6)
+        parts = [
+            f"{self.items / elapsed:.1f} foto/dtk",
+            f"{self.nbytes / 1024 / 1024 / elapsed:.2f} MB/dtk",
+        ]
+        if self.items and self.total > self.items:
+            eta = int(elapsed / self.items * (self.total - self.items))
+            parts.append(f"ETA {eta // 3600:02d}:{eta % 3600 // 60:02d}:{eta % 60:02d}")
+        return " | ".join(parts)
 
 
 def run_gui():
@@ -171,6 +1830,16 @@ def run_gui():
         input_file = entry_file.get().strip()
         base_url = combo_server.get()
         max_retries = int(spin_retry.get())
+        engine = combo_engine.get()
+        concurrency = int(spin_conc.get())
+        http2 = bool(http2_var.get())
+        run_mode = combo_mode.get()
+        atur_turunan(bool(derive_var.get()))
+        try:
+            foto_index = [int(x) for x in entry_foto.get().replace(" ", "").split(",") if x]
+        except ValueError:
+            messagebox.showerror("Input Error", "Foto ke harus angka, misal 1 atau 1,2,3")
+            return
 
         limit_raw = combo_limit.get().strip()
         limit_size = 0
@@ -183,18 +1852,19 @@ def run_gui():
 
         threading.Thread(
             target=main,
-            args=(thbl, cookie, input_file, base_url, progress_var, label_var, root, max_retries, limit_size),
+            args=(thbl, cookie, input_file, base_url, pump, max_retries, limit_size,
+                  engine, concurrency, http2, run_mode, MANIFEST_DB, foto_index or FOTO_INDEX),
             daemon=True
         ).start()
 
     root = tk.Tk()
     root.title("Downloader Foto ACMT")
 
-    tk.Label(root, text="THBL (misal 202510):").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+    tk.Label(root, text="THBL (202510 / 202508-202510):").grid(row=0, column=0, sticky="w", padx=5, pady=5)
     entry_thbl = tk.Entry(root, width=50)
     entry_thbl.grid(row=0, column=1, padx=5, pady=5)
 
-    tk.Label(root, text="Cookie:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+    tk.Label(root, text="Cookie (pisah ||):").grid(row=1, column=0, sticky="w", padx=5, pady=5)
     entry_cookie = tk.Entry(root, width=50)
     entry_cookie.grid(row=1, column=1, padx=5, pady=5)
 
@@ -204,7 +1874,7 @@ def run_gui():
     tk.Button(root, text="Browse", command=browse_file).grid(row=2, column=2, padx=5, pady=5)
 
     tk.Label(root, text="Server:").grid(row=3, column=0, sticky="w", padx=5, pady=5)
-    combo_server = ttk.Combobox(root, values=["portalapp.iconpln.co.id", "ap2t.pln.co.id"], width=47, state="readonly")
+    combo_server = ttk.Combobox(root, values=list(SERVERS.values()), width=47, state="readonly")
     combo_server.grid(row=3, column=1, padx=5, pady=5)
     combo_server.current(0)
 
@@ -220,22 +1890,66 @@ def run_gui():
     combo_limit.grid(row=5, column=1, padx=5, pady=5)
     combo_limit.current(0)  # default 5.000
 
+    # ENGINE: THREAD (10 thread) atau ASYNC (ratusan request paralel, butuh httpx)
+    tk.Label(root, text="Engine / paralel:").grid(row=6, column=0, sticky="w", padx=5, pady=5)
+    frame_engine = tk.Frame(root)
+    frame_engine.grid(row=6, column=1, sticky="w", padx=5, pady=5)
+    combo_engine = ttk.Combobox(frame_engine, values=ENGINES, width=10, state="readonly")
+    combo_engine.pack(side="left")
+    combo_engine.current(1 if async_tersedia() else 0)
+    spin_conc = tk.Spinbox(frame_engine, from_=1, to=2000, width=6)
+    spin_conc.delete(0, tk.END)
+    spin_conc.insert(0, str(ASYNC_CONCURRENCY))
+    spin_conc.pack(side="left", padx=5)
+    http2_var = tk.IntVar(value=0)
+    tk.Checkbutton(frame_engine, text="HTTP/2", variable=http2_var).pack(side="left")
+
+    # MODE RERUN (manifest)
+    tk.Label(root, text="Mode rerun:").grid(row=7, column=0, sticky="w", padx=5, pady=5)
+    combo_mode = ttk.Combobox(root, values=RUN_MODES, width=47, state="readonly")
+    combo_mode.grid(row=7, column=1, padx=5, pady=5)
+    combo_mode.current(0)
+
+    # FOTO KE (riwayat: lebih dari 1 foto per bulan)
+    tk.Label(root, text="Foto ke (1 / 1,2,3):").grid(row=8, column=0, sticky="w", padx=5, pady=5)
+    frame_foto = tk.Frame(root)
+    frame_foto.grid(row=8, column=1, sticky="w", padx=5, pady=5)
+    entry_foto = tk.Entry(frame_foto, width=10)
+    entry_foto.insert(0, ",".join(str(n) for n in FOTO_INDEX))
+    entry_foto.pack(side="left")
+    # TURUNAN: array model + thumbnail saat ingest (butuh numpy + pillow)
+    derive_var = tk.IntVar(value=int(DERIVE))
+    tk.Checkbutton(frame_foto, text="Buat turunan (array model + thumbnail)",
+                   variable=derive_var).pack(side="left", padx=10)
+
     progress_var = tk.IntVar()
     label_var = tk.StringVar(value="Progress: 0% (0/0)")
 
     progress_bar = ttk.Progressbar(root, variable=progress_var, maximum=100, length=400)
-    progress_bar.grid(row=6, column=0, columnspan=3, padx=5, pady=10)
+    progress_bar.grid(row=9, column=0, columnspan=3, padx=5, pady=10)
 
     progress_label = tk.Label(root, textvariable=label_var)
-    progress_label.grid(row=7, column=0, columnspan=3)
+    progress_label.grid(row=10, column=0, columnspan=3)
+
+    # Worker -> queue -> Tk thread (per batch, bukan 2x root.after per foto)
+    def on_progress(items):
+        percent, text = items[-1][:2]
+        progress_var.set(percent)
+        label_var.set(text)
+
+    pump = UiPump(root)
+    pump.on("progress", on_progress)
+    pump.start()
 
     btn_start = tk.Button(root, text="Mulai Download", command=start_download)
-    btn_start.grid(row=8, column=0, columnspan=3, pady=10)
+    btn_start.grid(row=11, column=0, columnspan=3, pady=10)
 
-    tk.Label(root, text="Created by MONEVMU").grid(row=9, column=0, sticky="w", padx=5, pady=5)
+    tk.Label(root, text="Created by MONEVMU").grid(row=12, column=0, sticky="w", padx=5, pady=5)
 
     root.mainloop()
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main_cli())
     run_gui()
\ No newline at end of file
@@ -22,7 +22,11 @@ import shutil
 import argparse
 import json
 import csv
+import multiprocessing
+import queue
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import tempfile
 
@@ -53,6 +57,26 @@ EXPECTED_IDPEL_LEN = 12
 
 IMG_EXT = [".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"]
 
+# Turunan dari downloader foto (--derive): {foto}.derived.npz di sebelah foto
+# asli + thumbnail JPEG di THUMB_DIR (struktur folder sama dengan --src)
+DERIVED_EXT = ".derived.npz"
+THUMB_DIR = "./2_thumbs"
+
+# Batch inference: input interpreter di-resize ke N gambar per invoke.
+# Default 1: tidak semua model hasilnya identik saat di-batch, aktifkan
+# lewat --batch setelah dicek dengan --benchmark
+BATCH_SIZE = 1
+BENCH_SIZES = "1,8,16,32"
+
+# Multi-proses: tiap worker punya interpreter sendiri, hasil dikirim urut ke
+# proses utama (satu-satunya penulis output)
+WORKERS = 1
+
+# Pipeline 1 proses: thread pembaca (prefetch + decode) -> thread inferensi ->
+# penulis (proses utama), dihubungkan antrean terbatas (satuan: potong batch)
+READERS = 4
+PREFETCH = 4
+
 # Format output yang didukung
 SUPPORTED_FORMATS = ["xlsx", "csv", "json", "txt"]
 
@@ -96,6 +120,32 @@ def parse_args():
     p.add_argument("--thumb_size", type=int, default=100,
                    help="Ukuran thumbnail dalam pixel")
 
+    # ✅ Pakai turunan downloader (tanpa decode ulang foto resolusi penuh)
+    p.add_argument("--thumbs", default=THUMB_DIR, help="Folder thumbnail turunan downloader")
+    p.add_argument("--no_derived", dest="use_derived", action="store_false",
+                   help=f"Abaikan {DERIVED_EXT}, selalu decode foto asli")
+    p.set_defaults(use_derived=True)
+
+    # ✅ Batch inference + benchmark
+    p.add_argument("--batch", type=int, default=BATCH_SIZE,
+                   help="Jumlah gambar per invoke TFLite (default 1 = per gambar)")
+    p.add_argument("--threads", type=int, default=None,
+                   help="num_threads interpreter TFLite (default: bawaan TensorFlow)")
+    p.add_argument("--benchmark", action="store_true",
+                   help="Ukur gambar/dtk untuk tiap ukuran batch (--bench_sizes) lalu keluar")
+    p.add_argument("--bench_sizes", default=BENCH_SIZES)
+    p.add_argument("--bench_images", type=int, default=256,
+                   help="Jumlah gambar dari --src yang dipakai benchmark")
+    p.add_argument("--workers", type=int, default=WORKERS,
+                   help="Jumlah proses verifikasi (0 = jumlah core); "
+                        "jika >1 dan --threads kosong, tiap proses pakai 1 thread")
+    p.add_argument("--readers", type=int, default=READERS,
+                   help="Thread pembaca/decode gambar pada pipeline 1 proses")
+    p.add_argument("--prefetch", type=int, default=PREFETCH,
+                   help="Kapasitas antrean antar tahap pipeline (dalam potong batch)")
+    p.add_argument("--no_pipeline", dest="pipeline", action="store_false",
+                   help="Mode serial: baca -> inferensi -> tulis bergantian")
+
     return p.parse_args()
 
 
@@ -115,9 +165,16 @@ def load_labels(path: str):
     neg_idx = 1 - kwh_idx
     return labels, kwh_idx, neg_idx
 
-def load_interpreter(model_path: str):
-    itp = tf.lite.Interpreter(model_path=model_path)
-    itp.allocate_tensors()
+def load_interpreter(model_path: str, num_threads=None, batch_size: int = 1):
+    itp = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+    try:
+        if batch_size > 1:
+            det = itp.get_input_details()[0]
+            itp.resize_tensor_input(det["index"], [batch_size] + [int(x) for x in det["shape"][1:]])
+        itp.allocate_tensors()
+    except (ValueError, RuntimeError) as e:
+        print(f"[WARN] Model tidak bisa batch {batch_size} ({e}), pakai batch 1")
+        return load_interpreter(model_path, num_threads, 1)
 
     in_det = itp.get_input_details()[0]
     out_det = itp.get_output_details()[0]
@@ -134,18 +191,97 @@ def softmax(x):
 # =====================================================
 # Preprocess (FAST): dari cv2 array, tanpa buka file lagi
 # =====================================================
-def preprocess_bgr_for_tflite(img_bgr, size_wh, dtype):
-    w, h = size_wh
-    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    resized = cv2.resize(rgb, (w, h), interpolation=cv2.INTER_AREA)
-
-    arr = resized.astype(np.float32)
+def normalize_batch(rgb_batch, dtype):
+    """Normalisasi [-1, 1] seluruh batch (N, H, W, 3) dalam 1 operasi NumPy."""
+    arr = rgb_batch.astype(np.float32)
     arr = (arr / 127.5) - 1.0
 
     if dtype == np.uint8:
         arr = ((arr + 1) * 127.5).clip(0, 255).astype(np.uint8)
 
-    return np.expand_dims(arr, axis=0)
+    return arr
+
+def normalize_for_tflite(rgb_resized, dtype):
+    return normalize_batch(np.expand_dims(rgb_resized, axis=0), dtype)
+
+def resize_for_tflite(img_bgr, size_wh):
+    w, h = size_wh
+    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    return cv2.resize(rgb, (w, h), interpolation=cv2.INTER_AREA)
+
+def preprocess_bgr_for_tflite(img_bgr, size_wh, dtype):
+    return normalize_for_tflite(resize_for_tflite(img_bgr, size_wh), dtype)
+
+
+# =====================================================
+# Batched inference: 1 invoke untuk N gambar
+# =====================================================
+def raw_to_probs(raw):
+    raw = np.squeeze(raw)
+    if np.ndim(raw) == 0:
+        return np.array([1 - float(raw), float(raw)], dtype=np.float32)
+    return softmax(raw.astype(np.float32))
+
+def infer_batch(itp, in_det, out_det, rgb_list, dtype):
+    """
+    Inferensi list array RGB (uint8, ukuran model) -> list probabilitas per gambar.
+    Batch yang lebih kecil dari input interpreter (sisa terakhir) dipad dengan
+    gambar terakhir; hasil padding dibuang.
+    """
+    size = int(in_det["shape"][0])
+    if len(rgb_list) > size:
+        # interpreter fallback ke batch lebih kecil
+        return [p for i in range(0, len(rgb_list), size)
+                for p in infer_batch(itp, in_det, out_det, rgb_list[i:i + size], dtype)]
+
+    n = len(rgb_list)
+    inp = normalize_batch(np.stack(rgb_list), dtype)
+    if n < size:
+        inp = np.concatenate([inp, np.repeat(inp[-1:], size - n, axis=0)])
+
+    itp.set_tensor(in_det["index"], inp)
+    itp.invoke()
+    out = itp.get_tensor(out_det["index"])
+    return [raw_to_probs(out[i]) for i in range(n)]
+
+
+# =====================================================
+# Turunan downloader: array model + metrik, tanpa decode foto asli
+# =====================================================
+def load_derived(img_path: Path, size_wh, resize="stretch"):
+    """
+    Return dict {model, brightness, contrast, blur} dari {foto}.derived.npz,
+    atau None jika tidak ada / lebih lama dari foto / beda ukuran, cara resize
+    atau orientasi (harus sudah diputar sesuai EXIF, seperti cv2.imread).
+    """
+    p = img_path.with_name(img_path.stem + DERIVED_EXT)
+    try:
+        if p.stat().st_mtime < img_path.stat().st_mtime:
+            return None
+        with np.load(p) as z:
+            model = z["model"]
+            if str(z["resize"]) != resize or model.shape[:2] != (size_wh[1], size_wh[0]):
+                return None
+            if str(z["orientasi"]) != "exif":
+                return None
+            return {
+                "model": model,
+                "brightness": float(z["brightness"]),
+                "contrast": float(z["contrast"]),
+                "blur": float(z["blur"]),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+def load_thumb(img_path: Path, src_dir: Path, thumb_dir: Path, min_px: int):
+    """Thumbnail turunan (BGR) jika ada dan cukup besar untuk --thumb_size."""
+    try:
+        t = cv2.imread(str(thumb_dir / img_path.relative_to(src_dir)))
+    except ValueError:
+        return None
+    if t is None or max(t.shape[:2]) < min_px:
+        return None
+    return t
 
 
 # =====================================================
@@ -160,6 +296,11 @@ def normalize_idpel_digits(d: str, expected_len: int = 12) -> str:
     return d
 
 def extract_idpel_from_filename(img_path: Path, expected_len: int = 12) -> str:
+    # Riwayat multi-bulan: {idpel}_{blth}_{n}.jpg -> grup digit yang panjangnya pas
+    if expected_len:
+        for g in re.findall(r"\d+", img_path.stem):
+            if len(g) == expected_len:
+                return g
     stem_digits = re.sub(r"\D+", "", img_path.stem)
     if not stem_digits:
         return ""
@@ -192,29 +333,372 @@ def check_image_quality(img_bgr, brightness_threshold=30.0, contrast_threshold=2
         # Contrast check (standar deviasi intensitas pixel)
         contrast = np.std(gray)
         
-        is_good = (brightness >= brightness_threshold) and (contrast >= contrast_threshold)
-        
-        return is_good, float(brightness), float(contrast)
+        return judge_quality(brightness, contrast, brightness_threshold, contrast_threshold)
     except Exception:
         return False, 0.0, 0.0
 
+def judge_quality(brightness, contrast, brightness_threshold=30.0, contrast_threshold=20.0):
+    is_good = (brightness >= brightness_threshold) and (contrast >= contrast_threshold)
+    return is_good, float(brightness), float(contrast)
+
+
+# =====================================================
+# Per gambar: load (+ cek kualitas) dan evaluasi hasil model
+# =====================================================
+def load_item(img_path: Path, args, src_dir: Path, thumb_dir: Path, model_size):
+    """
+    Decode + preprocess 1 gambar (tanpa inferensi). Return dict atau None jika
+    gambar gagal dibaca. "rgb" = array uint8 ukuran model untuk infer_batch().
+    """
+    derived = load_derived(img_path, model_size) if args.use_derived else None
+    if derived is not None:
+        # ✅ Turunan downloader: tanpa decode foto resolusi penuh
+        rgb = derived["model"]
+        bscore = derived["blur"]
+        is_good_quality, brightness, contrast = judge_quality(
+            derived["brightness"], derived["contrast"],
+            args.brightness_threshold, args.contrast_threshold)
+        img_bgr = None
+        if args.embed_images:
+            img_bgr = load_thumb(img_path, src_dir, thumb_dir, args.thumb_size)
+            if img_bgr is None:
+                img_bgr = cv2.imread(str(img_path))
+    else:
+        img_bgr = cv2.imread(str(img_path))
+        if img_bgr is None:
+            return None
+        rgb = resize_for_tflite(img_bgr, model_size)
+        bscore = blur_score(img_bgr)
+        is_good_quality, brightness, contrast = check_image_quality(
+            img_bgr, args.brightness_threshold, args.contrast_threshold)
+
+    return {
+        "path": img_path,
+        "rgb": rgb,
+        "blur": bscore,
+        "good": is_good_quality,
+        # thumbnail Excel langsung kecil: hemat memory & murah dikirim antar proses
+        "img_bgr": resize_for_excel(img_bgr, args.thumb_size) if args.embed_images and img_bgr is not None else None,
+        "derived": derived is not None,
+    }
+
+def evaluate_item(item, probs, args, kwh_idx, neg_idx):
+    """
+    Aturan PASS/FAIL dari probabilitas + kualitas. Return (status_ok, idpel, notes);
+    notes = baris log [FAIL], dicetak oleh proses utama sesuai urutan gambar.
+    """
+    img_path = item["path"]
+    idpel = extract_idpel_from_filename(img_path, args.expected_idpel_len)
+    idpel = normalize_idpel_digits(idpel, args.expected_idpel_len)
+
+    p_kwh = float(probs[kwh_idx])
+    p_neg = float(probs[neg_idx])
+    pred = "KWH" if p_kwh >= p_neg else "NEG"
+
+    # ===== Quality checks =====
+    status_ok = True
+    notes = []
+
+    # 1. Check blur
+    if item["blur"] < args.blur_threshold:
+        status_ok = False
+        notes.append(f"[FAIL] {img_path.name}: Blur ({item['blur']:.1f})")
+
+    # 2. Check brightness/contrast
+    if not item["good"]:
+        status_ok = False
+        notes.append(f"[FAIL] {img_path.name}: Kualitas rendah")
+
+    # 3. Check pagar
+    if "pagar" in img_path.name.lower() or "pagar" in str(img_path.parent).lower():
+        status_ok = False
+        notes.append(f"[FAIL] {img_path.name}: Mengandung 'pagar'")
+
+    # 4. Check classification
+    if pred == "NEG":
+        status_ok = False
+        notes.append(f"[FAIL] {img_path.name}: NEG ({p_neg:.2f})")
+    elif pred == "KWH" and p_kwh < args.kwh_threshold:
+        status_ok = False
+        notes.append(f"[FAIL] {img_path.name}: KWH rendah ({p_kwh:.2f})")
+
+    return status_ok, idpel, notes
+
+
+# =====================================================
+# Worker: interpreter per proses + proses 1 potong daftar gambar
+# =====================================================
+_CTX = None
+
+def init_worker(args):
+    """Dipanggil 1x per proses (atau 1x di proses utama jika --workers 1)."""
+    global _CTX
+    labels, kwh_idx, neg_idx = load_labels(args.labels)
+    itp, in_det, out_det, (in_h, in_w, dtype) = load_interpreter(args.model, args.threads, max(1, args.batch))
+    _CTX = {
+        "args": args,
+        "itp": itp,
+        "in_det": in_det,
+        "out_det": out_det,
+        "dtype": dtype,
+        "model_size": (in_w, in_h),
+        "kwh_idx": kwh_idx,
+        "neg_idx": neg_idx,
+        "src_dir": Path(args.src),
+        "thumb_dir": Path(args.thumbs),
+    }
+    return _CTX
+
+def load_one(img_path):
+    """Baca + decode 1 gambar (aman dipanggil paralel). Return (hasil, item/None)."""
+    c = _CTX
+    res = {"path": img_path, "error": "", "notes": [], "ok": False,
+           "idpel": "", "img_bgr": None, "derived": False}
+    try:
+        item = load_item(img_path, c["args"], c["src_dir"], c["thumb_dir"], c["model_size"])
+    except Exception as e:
+        res["error"] = f"[ERROR] {img_path.name}: {e}"
+        return res, None
+    if item is None:
+        res["error"] = f"[ERROR] Gagal membaca: {img_path.name}"
+        return res, None
+    res["derived"] = item["derived"]
+    return res, item
+
+def process_chunk(paths):
+    """
+    Load + inferensi (1 batch) + evaluasi untuk 1 potong daftar gambar.
+    Tidak print apa pun; return (hasil per gambar sesuai urutan `paths`,
+    detik inferensi, jumlah gambar terinferensi) untuk ditulis proses utama.
+    """
+    return infer_chunk([load_one(p) for p in paths])
+
+def infer_chunk(loaded):
+    """Inferensi (1 batch) + evaluasi untuk hasil load_one; return seperti process_chunk."""
+    c = _CTX
+    args = c["args"]
+    results = [res for res, _ in loaded]
+    items = [(res, item) for res, item in loaded if item is not None]
+
+    if not items:
+        return results, 0.0, 0
+
+    # ===== TFLite inference (1 invoke per batch) =====
+    t0 = time.perf_counter()
+    try:
+        probs_list = infer_batch(c["itp"], c["in_det"], c["out_det"],
+                                 [it["rgb"] for _, it in items], c["dtype"])
+    except Exception as e:
+        for res, _ in items:
+            res["error"] = f"[ERROR] {res['path'].name}: {e}"
+        return results, 0.0, 0
+    infer_time = time.perf_counter() - t0
+
+    for (res, item), probs in zip(items, probs_list):
+        try:
+            res["ok"], res["idpel"], res["notes"] = evaluate_item(
+                item, probs, args, c["kwh_idx"], c["neg_idx"])
+            res["img_bgr"] = item["img_bgr"]
+        except Exception as e:
+            res["error"] = f"[ERROR] {res['path'].name}: {e}"
+    return results, infer_time, len(items)
+
+
+# =====================================================
+# Pipeline bertahap (1 proses)
+# =====================================================
+class Stage:
+    """Statistik 1 tahap: waktu kerja, jumlah gambar, okupansi antrean masuknya."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.wait = 0.0
+        self.items = 0
+        self.q_sum = 0
+        self.q_n = 0
+        self.q_max = 0
+        self._lock = threading.Lock()
+
+    def add(self, busy, n=1):
+        with self._lock:
+            self.busy += busy
+            self.items += n
+
+    def sample(self, q):
+        """Catat isi antrean masuk tepat sebelum tahap mengambil item."""
+        size = q.qsize()
+        self.q_sum += size
+        self.q_n += 1
+        self.q_max = max(self.q_max, size)
+
+    def occupancy(self):
+        return self.q_sum / self.q_n if self.q_n else 0.0
+
+    def utilization(self, wall):
+        return self.busy / (wall * self.workers) if wall > 0 else 0.0
+
+
+def run_pipeline(chunks, readers, prefetch, stages):
+    """
+    Generator hasil per potong (urut sama dengan `chunks`, sama seperti
+    map(process_chunk, chunks)):
+      baca      : ThreadPoolExecutor(readers) -> load_one (I/O + decode, lepas GIL)
+      inferensi : 1 thread, infer_chunk per potong (interpreter hanya dipakai di sini)
+      tulis     : pemanggil generator (proses utama)
+    Antrean antar tahap dibatasi `prefetch` potong, jadi memori tetap kecil.
+    `stages` diisi waktu kerja, waktu tunggu & okupansi antrean tiap tahap.
+    """
+    done = object()
+    stop = threading.Event()
+    q_read = queue.Queue(maxsize=prefetch)  # potong berisi futures decode
+    q_out = queue.Queue(maxsize=prefetch)   # hasil infer_chunk
+    st_read, st_infer, st_write = stages["baca"], stages["inferensi"], stages["tulis"]
+
+    def put(q, x):
+        while not stop.is_set():
+            try:
+                q.put(x, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return done
+
+    def load_timed(img_path):
+        t0 = time.perf_counter()
+        try:
+            return load_one(img_path)
+        finally:
+            st_read.add(time.perf_counter() - t0)
+
+    def feeder(executor):
+        try:
+            for chunk in chunks:
+                if not put(q_read, [executor.submit(load_timed, p) for p in chunk]):
+                    return
+        finally:
+            put(q_read, done)
+
+    def infer_loop():
+        try:
+            while True:
+                st_infer.sample(q_read)
+                t0 = time.perf_counter()
+                futs = get(q_read)
+                if futs is done:
+                    break
+                loaded = [f.result() for f in futs]
+                t1 = time.perf_counter()
+                out = infer_chunk(loaded)
+                t2 = time.perf_counter()
+                st_infer.wait += t1 - t0
+                st_infer.add(t2 - t1, len(loaded))
+                if not put(q_out, out):
+                    return
+                st_infer.wait += time.perf_counter() - t2  # tertahan penulis
+        except Exception as e:
+            put(q_out, e)
+        finally:
+            put(q_out, done)
+
+    with ThreadPoolExecutor(max_workers=max(1, readers), thread_name_prefix="baca") as executor:
+        threads = [threading.Thread(target=feeder, args=(executor,), daemon=True),
+                   threading.Thread(target=infer_loop, daemon=True)]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                st_write.sample(q_out)
+                t0 = time.perf_counter()
+                out = q_out.get()
+                st_write.wait += time.perf_counter() - t0
+                if out is done:
+                    break
+                if isinstance(out, Exception):
+                    raise out
+                yield out
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+
+
+def print_stage_report(stages, wall, prefetch):
+    """Ringkasan per tahap; tahap dengan utilisasi tertinggi = bottleneck."""
+    print(f"Tahap pipeline    : (antrean maks {prefetch} potong)")
+    for st in stages.values():
+        rate = st.items / st.busy if st.busy > 0 else 0.0
+        # Pembaca diberi tugas langsung lewat executor (tanpa antrean masuk sendiri)
+        queue_info = (f"tunggu {st.wait:6.1f} dtk, antrean masuk rata2 {st.occupancy():.1f} "
+                      f"(maks {st.q_max})") if st.q_n else "tunggu      - dtk, antrean masuk -"
+        print(f"  {st.name:<9} x{st.workers:<3}: kerja {st.busy:6.1f} dtk "
+              f"({st.utilization(wall) * 100:5.1f}%), {queue_info}, {rate:.1f} gambar/dtk")
+    bottleneck = max(stages.values(), key=lambda st: st.utilization(wall))
+    print(f"  Bottleneck      : {bottleneck.name}")
+
+
+# =====================================================
+# Benchmark batch size
+# =====================================================
+def run_benchmark(args, items, dtype):
+    """
+    Ukur gambar/dtk inferensi (normalisasi + invoke) per ukuran batch.
+    Probabilitas tiap ukuran batch dibandingkan dengan batch 1 (harus identik).
+    """
+    sizes = sorted({1} | {int(x) for x in args.bench_sizes.split(",") if x.strip()})
+    rgbs = [it["rgb"] for it in items]
+    ref = None
+
+    print(f"[BENCH] {len(rgbs)} gambar, threads={args.threads or 'default'} (decode tidak dihitung)")
+    for bs in sizes:
+        itp, in_det, out_det, _ = load_interpreter(args.model, args.threads, bs)
+        bs = int(in_det["shape"][0])
+        infer_batch(itp, in_det, out_det, rgbs[:bs], dtype)  # warm-up
+
+        t0 = time.perf_counter()
+        probs = []
+        for i in range(0, len(rgbs), bs):
+            probs += infer_batch(itp, in_det, out_det, rgbs[i:i + bs], dtype)
+        dt = time.perf_counter() - t0
+
+        probs = np.array(probs)
+        if ref is None:
+            ref = probs
+        diff = float(np.abs(probs - ref).max())
+        print(f"[BENCH] batch {bs:>4}: {len(rgbs) / dt:8.1f} gambar/dtk | "
+              f"selisih maks vs batch 1 = {diff:.2e}{' (identik)' if diff == 0 else ''}")
+
 
 # =====================================================
 # Thumbnail untuk Excel
 # =====================================================
+def resize_for_excel(img_bgr, thumb_size=100):
+    """Resize ke ukuran thumbnail Excel (dilakukan saat load, bukan simpan full-res)"""
+    h, w = img_bgr.shape[:2]
+
+    # Hitung scaling factor
+    scale = thumb_size / max(h, w)
+    new_w = int(w * scale)
+    new_h = int(h * scale)
+
+    return cv2.resize(img_bgr, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
 def create_thumbnail_for_excel(img_bgr, thumb_size=100):
     """Buat thumbnail untuk dimasukkan ke Excel"""
+    return save_thumbnail_png(resize_for_excel(img_bgr, thumb_size))
+
+def save_thumbnail_png(resized):
+    """Simpan thumbnail (BGR, sudah di-resize) ke file PNG temporary"""
     try:
-        h, w = img_bgr.shape[:2]
-        
-        # Hitung scaling factor
-        scale = thumb_size / max(h, w)
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-        
-        # Resize image
-        resized = cv2.resize(img_bgr, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        
         # Convert BGR to RGB
         rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
         
@@ -223,8 +707,9 @@ def create_thumbnail_for_excel(img_bgr, thumb_size=100):
         pil_img = Image.fromarray(rgb)
         
         # Save to temporary file
-        temp_dir = tempfile.gettempdir()
-        temp_path = Path(temp_dir) / f"thumb_{int(time.time())}_{hash(str(img_bgr))}.png"
+        fd, temp_path = tempfile.mkstemp(prefix="thumb_", suffix=".png")
+        os.close(fd)
+        temp_path = Path(temp_path)
         pil_img.save(str(temp_path), format="PNG", optimize=True)
         
         return temp_path
@@ -274,7 +759,11 @@ def build_workbook_with_images():
 # Fungsi untuk menyimpan ke berbagai format
 # =====================================================
 def save_to_excel_with_images(data, output_path, thumb_size=100):
-    """Simpan data ke Excel dengan gambar thumbnail (HANYA 2 KOLOM)"""
+    """
+    Simpan data ke Excel dengan gambar thumbnail (HANYA 2 KOLOM).
+    Gambar di `data` sudah seukuran thumbnail (resize_for_excel saat load),
+    atau sudah berupa PNG temporary (Path) yang dibuat tahap tulis.
+    """
     print(f"[INFO] Membuat Excel dengan gambar thumbnail...")
     
     wb, ws = build_workbook_with_images()
@@ -291,8 +780,8 @@ def save_to_excel_with_images(data, output_path, thumb_size=100):
             # Tambah gambar thumbnail jika tersedia
             if img_bgr is not None:
                 try:
-                    # Buat thumbnail
-                    temp_thumb = create_thumbnail_for_excel(img_bgr, thumb_size)
+                    # Buat thumbnail (kecuali sudah dibuat saat scan)
+                    temp_thumb = img_bgr if isinstance(img_bgr, Path) else save_thumbnail_png(img_bgr)
                     if temp_thumb and temp_thumb.exists():
                         # Tambah gambar ke Excel (kolom A)
                         img = XLImage(str(temp_thumb))
@@ -404,10 +893,10 @@ def main():
     # Import PIL di sini
     from PIL import Image
 
-    labels, kwh_idx, neg_idx = load_labels(args.labels)
-    itp, in_det, out_det, meta = load_interpreter(args.model)
-    in_h, in_w, dtype = meta
-    model_size = (in_w, in_h)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if workers > 1 and args.threads is None:
+        args.threads = 1  # N proses x 1 thread, hindari rebutan core
+    batch_size = max(1, args.batch)
 
     src_dir = Path(args.src)
     dst_dir = Path(args.dst)
@@ -422,92 +911,102 @@ def main():
     images = [p for p in src_dir.rglob("*") if p.is_file() and p.suffix.lower() in IMG_EXT]
     images.sort(key=lambda x: x.name.lower())
 
+    if args.benchmark:
+        c = init_worker(args)
+        items = [it for it in (load_item(p, args, src_dir, c["thumb_dir"], c["model_size"])
+                               for p in images[:args.bench_images]) if it is not None]
+        if not items:
+            print("[ERROR] Tidak ada gambar untuk benchmark")
+            return
+        run_benchmark(args, items, c["dtype"])
+        return
+
     total = 0
     passed = 0
     failed = 0
+    errors = 0  # gagal dibaca / error (ikut dihitung di failed)
+    from_derived = 0
+    infer_time = 0.0
+    inferred = 0
 
     print(f"[INFO] Memulai verifikasi {len(images)} gambar...")
     print(f"[INFO] Output: {log_path.name}")
     print(f"[INFO] Format: {args.format.upper()}")
     print(f"[INFO] Mode: {'Hanya gambar PASS' if args.pass_only else 'Semua gambar'}")
     print(f"[INFO] Gambar di Excel: {'YA' if args.embed_images and args.format == 'xlsx' else 'TIDAK'}")
+    print(f"[INFO] Batch inferensi: {batch_size} | threads: {args.threads or 'default'} | proses: {workers}")
+    use_pipeline = args.pipeline and workers <= 1
+    if use_pipeline:
+        print(f"[INFO] Pipeline: {max(1, args.readers)} pembaca -> inferensi -> tulis "
+              f"(prefetch {max(1, args.prefetch)} potong)")
     print("-" * 60)
 
-    for img_path in images:
-        try:
-            img_bgr = cv2.imread(str(img_path))
-            if img_bgr is None:
-                print(f"[ERROR] Gagal membaca: {img_path.name}")
-                failed += 1
-                continue
-
-            idpel = extract_idpel_from_filename(img_path, args.expected_idpel_len)
-            idpel = normalize_idpel_digits(idpel, args.expected_idpel_len)
-
-            # ===== TFLite inference =====
-            inp = preprocess_bgr_for_tflite(img_bgr, model_size, dtype)
-            itp.set_tensor(in_det["index"], inp)
-            itp.invoke()
-            raw = np.squeeze(itp.get_tensor(out_det["index"]))
-
-            if np.ndim(raw) == 0:
-                probs = np.array([1 - float(raw), float(raw)], dtype=np.float32)
-            else:
-                probs = softmax(raw.astype(np.float32))
-
-            p_kwh = float(probs[kwh_idx])
-            p_neg = float(probs[neg_idx])
-            pred = "KWH" if p_kwh >= p_neg else "NEG"
-
-            # ===== Quality checks =====
-            status_ok = True
-            
-            # 1. Check blur
-            bscore = blur_score(img_bgr)
-            if bscore < args.blur_threshold:
-                status_ok = False
-                print(f"[FAIL] {img_path.name}: Blur ({bscore:.1f})")
-
-            # 2. Check brightness/contrast
-            is_good_quality, brightness, contrast = check_image_quality(
-                img_bgr, args.brightness_threshold, args.contrast_threshold)
-            if not is_good_quality:
-                status_ok = False
-                print(f"[FAIL] {img_path.name}: Kualitas rendah")
-
-            # 3. Check pagar
-            if "pagar" in img_path.name.lower() or "pagar" in str(img_path.parent).lower():
-                status_ok = False
-                print(f"[FAIL] {img_path.name}: Mengandung 'pagar'")
-
-            # 4. Check classification
-            if pred == "NEG":
-                status_ok = False
-                print(f"[FAIL] {img_path.name}: NEG ({p_neg:.2f})")
-            elif pred == "KWH" and p_kwh < args.kwh_threshold:
-                status_ok = False
-                print(f"[FAIL] {img_path.name}: KWH rendah ({p_kwh:.2f})")
-
-            total += 1
-            
-            # Simpan data jika valid
-            if status_ok:
-                passed += 1
-                valid_data.append((img_path, idpel, img_bgr if args.embed_images else None))
-                print(f"[PASS] {img_path.name}: IDPEL={idpel}")
-            elif not args.pass_only:
-                failed += 1
-                valid_data.append((img_path, idpel, img_bgr if args.embed_images else None))
-                print(f"[FAIL] {img_path.name}: IDPEL={idpel}")
-            else:
-                failed += 1
-
-            if total % 50 == 0:
-                print(f"[PROGRESS] {total}/{len(images)} gambar diproses...")
+    # Potongan berurutan; imap mengembalikan hasil sesuai urutan potongan,
+    # jadi output identik dengan mode 1 proses
+    chunks = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    t_start = time.perf_counter()
+    pool = None
+    stages = None
+    # PNG thumbnail Excel dibuat di tahap tulis (tumpang tindih dengan inferensi),
+    # bukan semuanya di akhir saat menyimpan
+    render_png = args.format == "xlsx" and args.embed_images
+    if workers > 1 and len(chunks) > 1:
+        pool = multiprocessing.get_context("spawn").Pool(
+            min(workers, len(chunks)), initializer=init_worker, initargs=(args,))
+        stream = pool.imap(process_chunk, chunks)
+    elif use_pipeline:
+        init_worker(args)
+        stages = {"baca": Stage("baca", max(1, args.readers)),
+                  "inferensi": Stage("inferensi"),
+                  "tulis": Stage("tulis")}
+        stream = run_pipeline(chunks, args.readers, max(1, args.prefetch), stages)
+    else:
+        init_worker(args)
+        stream = map(process_chunk, chunks)
 
-        except Exception as e:
-            print(f"[ERROR] {img_path.name}: {e}")
-            failed += 1
+    try:
+        for results, dt, n in stream:
+            t_write = time.perf_counter()
+            infer_time += dt
+            inferred += n
+            for res in results:
+                img_path = res["path"]
+                if render_png and res["img_bgr"] is not None and (res["ok"] or not args.pass_only):
+                    res["img_bgr"] = save_thumbnail_png(res["img_bgr"])
+                if res["error"]:
+                    print(res["error"])
+                    failed += 1
+                    errors += 1
+                    continue
+                from_derived += res["derived"]
+                for note in res["notes"]:
+                    print(note)
+                total += 1
+                idpel = res["idpel"]
+
+                # Simpan data jika valid
+                if res["ok"]:
+                    passed += 1
+                    valid_data.append((img_path, idpel, res["img_bgr"]))
+                    print(f"[PASS] {img_path.name}: IDPEL={idpel}")
+                elif not args.pass_only:
+                    failed += 1
+                    valid_data.append((img_path, idpel, res["img_bgr"]))
+                    print(f"[FAIL] {img_path.name}: IDPEL={idpel}")
+                else:
+                    failed += 1
+
+                if total % 50 == 0:
+                    print(f"[PROGRESS] {total}/{len(images)} gambar diproses...")
+            if stages is not None:
+                stages["tulis"].add(time.perf_counter() - t_write, len(results))
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()  # hentikan thread pipeline jika keluar lebih awal
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - t_start
 
     # ✅ SIMPAN DATA
     if valid_data:
@@ -538,6 +1037,13 @@ def main():
     print(f"Total dipindai    : {total}")
     print(f"Valid (PASS)      : {passed}")
     print(f"Tidak valid       : {failed}")
+    print(f"Dari turunan      : {from_derived} (tanpa decode foto asli)")
+    if infer_time > 0:
+        print(f"Inferensi         : {inferred / infer_time:.1f} gambar/dtk per proses (batch {batch_size})")
+    if elapsed > 0:
+        print(f"Waktu scan        : {elapsed:.1f} dtk ({(total + errors) / elapsed:.1f} gambar/dtk, {workers} proses)")
+    if stages is not None:
+        print_stage_report(stages, elapsed, max(1, args.prefetch))
     
     if total > 0:
         success_rate = (passed/total*100)
@@ -1,8 +1,10 @@
 # pip install numpy pillow tensorflow openpyxl
 
 import re
+import time
 import shutil
 import argparse
+import itertools
 from pathlib import Path
 
 import numpy as np
@@ -27,6 +29,16 @@ NEG_THRESHOLD = 0.7   # NEG minimal untuk dianggap "NEG kuat"
 KWH_THRESHOLD = 0.7   # KWH minimal untuk dianggap "TRUE"
 IMG_EXT = [".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"]
 
+# turunan downloader foto (--derive --derive-resize fit): array model siap pakai
+# di {foto}.derived.npz + thumbnail JPEG di THUMB_DIR (struktur folder = --src)
+DERIVED_EXT = ".derived.npz"
+THUMB_DIR = "./2_thumbs"
+
+# batch inference: input interpreter di-resize ke N gambar per invoke.
+# default 1 (opt-in via --batch): tidak semua model identik saat di-batch
+BATCH_SIZE = 1
+BENCH_SIZES = "1,8,16,32"
+
 # =====================================================
 # ARGUMENT PARSER
 # =====================================================
@@ -52,6 +64,19 @@ def parse_args():
     p.add_argument("--no_embed_images", dest="embed_images", action="store_false")
     p.add_argument("--thumb_size", type=int, default=160, help="Ukuran max thumbnail (px)")
 
+    # turunan downloader (tanpa decode ulang foto resolusi penuh)
+    p.add_argument("--thumbs", default=THUMB_DIR, help="Folder thumbnail turunan downloader")
+    p.add_argument("--no_derived", dest="use_derived", action="store_false", default=True,
+                   help=f"Abaikan {DERIVED_EXT}, selalu decode foto asli")
+
+    # batch inference + benchmark
+    p.add_argument("--batch", type=int, default=BATCH_SIZE, help="Jumlah gambar per invoke (default 1 = per gambar)")
+    p.add_argument("--threads", type=int, default=None, help="num_threads interpreter (default: bawaan TF)")
+    p.add_argument("--benchmark", action="store_true",
+                   help="Ukur gambar/dtk tiap ukuran batch (--bench_sizes) lalu keluar")
+    p.add_argument("--bench_sizes", default=BENCH_SIZES)
+    p.add_argument("--bench_images", type=int, default=256)
+
     return p.parse_args()
 
 # =====================================================
@@ -69,9 +94,16 @@ def load_labels(path):
 # =====================================================
 # LOAD MODEL
 # =====================================================
-def load_interpreter(model_path):
-    itp = tf.lite.Interpreter(model_path=model_path)
-    itp.allocate_tensors()
+def load_interpreter(model_path, num_threads=None, batch_size=1):
+    itp = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+    try:
+        if batch_size > 1:
+            det = itp.get_input_details()[0]
+            itp.resize_tensor_input(det["index"], [batch_size] + [int(x) for x in det["shape"][1:]])
+        itp.allocate_tensors()
+    except (ValueError, RuntimeError) as e:
+        print(f"[WARN] Model tidak bisa batch {batch_size} ({e}), pakai batch 1")
+        return load_interpreter(model_path, num_threads, 1)
 
     in_det = itp.get_input_details()[0]
     out_det = itp.get_output_details()[0]
@@ -84,11 +116,17 @@ def load_interpreter(model_path):
 # =====================================================
 # PREPROCESS (TEACHABLE MACHINE STYLE)
 # =====================================================
-def preprocess_image(img_path, size, dtype):
+def load_model_array(img_path, size):
     img = Image.open(img_path).convert("RGB")
     img = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+    return np.asarray(img)
+
+def preprocess_image(img_path, size, dtype):
+    return normalize_array(load_model_array(img_path, size), dtype)
 
-    arr = np.asarray(img).astype(np.float32)
+def normalize_batch(arr, dtype):
+    """Normalisasi array (N, H, W, 3) sekaligus, 1 operasi NumPy per langkah."""
+    arr = arr.astype(np.float32)
 
     # normalize: [-1, 1]
     arr = (arr / 127.5) - 1.0
@@ -96,7 +134,33 @@ def preprocess_image(img_path, size, dtype):
     if dtype == np.uint8:
         arr = ((arr + 1) * 127.5).clip(0, 255).astype(np.uint8)
 
-    return np.expand_dims(arr, axis=0)
+    return arr
+
+def normalize_array(arr, dtype):
+    return normalize_batch(np.expand_dims(arr, axis=0), dtype)
+
+# =====================================================
+# TURUNAN DOWNLOADER
+# =====================================================
+def load_derived(img_path: Path, size):
+    """
+    Array model (uint8 HxWx3) dari {foto}.derived.npz jika ada, tidak lebih lama
+    dari foto, dan dibuat dengan crop tengah ("fit") seukuran input model tanpa
+    rotasi EXIF (sama dengan Image.open di load_model_array).
+    """
+    p = img_path.with_name(img_path.stem + DERIVED_EXT)
+    try:
+        if p.stat().st_mtime < img_path.stat().st_mtime:
+            return None
+        with np.load(p) as z:
+            model = z["model"]
+            if str(z["resize"]) != "fit" or model.shape[:2] != (size[1], size[0]):
+                return None
+            if str(z["orientasi"]) != "mentah":
+                return None
+            return model
+    except (OSError, KeyError, ValueError):
+        return None
 
 # =====================================================
 # SOFTMAX SAFE
@@ -105,6 +169,67 @@ def softmax(x):
     e = np.exp(x - np.max(x))
     return e / e.sum()
 
+# =====================================================
+# BATCH INFERENCE
+# =====================================================
+def raw_to_probs(raw):
+    raw = np.squeeze(raw)
+
+    # handle sigmoid / softmax output
+    if raw.ndim == 0:
+        return np.array([1 - raw, raw], dtype=np.float32)
+    return softmax(raw.astype(np.float32))
+
+def infer_batch(itp, in_det, out_det, arrs, dtype):
+    """
+    1 invoke untuk list array uint8 ukuran model -> list probabilitas per gambar.
+    Batch sisa (lebih kecil dari input interpreter) dipad gambar terakhir.
+    """
+    n = len(arrs)
+    size = int(in_det["shape"][0])
+    inp = normalize_batch(np.stack(arrs), dtype)
+    if n < size:
+        inp = np.concatenate([inp, np.repeat(inp[-1:], size - n, axis=0)])
+
+    itp.set_tensor(in_det["index"], inp)
+    itp.invoke()
+    out = itp.get_tensor(out_det["index"])
+    return [raw_to_probs(out[i]) for i in range(n)]
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run_benchmark(args, arrs, dtype):
+    """Gambar/dtk per ukuran batch; probabilitas dibandingkan dengan batch 1."""
+    sizes = sorted({1} | {int(x) for x in args.bench_sizes.split(",") if x.strip()})
+    ref = None
+
+    print(f"[BENCH] {len(arrs)} gambar, threads={args.threads or 'default'} (decode tidak dihitung)")
+    for bs in sizes:
+        itp, in_det, out_det, _ = load_interpreter(args.model, args.threads, bs)
+        bs = int(in_det["shape"][0])
+        infer_batch(itp, in_det, out_det, arrs[:bs], dtype)  # warm-up
+
+        t0 = time.perf_counter()
+        probs = []
+        for batch in iter_batches(arrs, bs):
+            probs += infer_batch(itp, in_det, out_det, batch, dtype)
+        dt = time.perf_counter() - t0
+
+        probs = np.array(probs)
+        if ref is None:
+            ref = probs
+        diff = float(np.abs(probs - ref).max())
+        print(f"[BENCH] batch {bs:>4}: {len(arrs) / dt:8.1f} gambar/dtk | "
+              f"selisih maks vs batch 1 = {diff:.2e}{' (identik)' if diff == 0 else ''}")
+
 # =====================================================
 # BEST-EFFORT EXTRACT IDPEL & STAND
 # =====================================================
@@ -144,12 +269,18 @@ def extract_idpel_and_stand(img_path: Path):
 # =====================================================
 # THUMBNAIL FOR EXCEL
 # =====================================================
-def make_thumbnail(src_path: Path, thumb_dir: Path, max_px: int) -> Path:
+def make_thumbnail(src_path: Path, thumb_dir: Path, max_px: int, derived_thumb: Path = None) -> Path:
     thumb_dir.mkdir(parents=True, exist_ok=True)
     thumb_path = thumb_dir / f"{src_path.stem}__thumb.png"
     if thumb_path.exists():
         return thumb_path
 
+    # thumbnail turunan downloader cukup besar -> tidak perlu decode foto asli
+    if derived_thumb is not None and derived_thumb.exists():
+        with Image.open(derived_thumb) as t:
+            if max(t.size) >= max_px:
+                src_path = derived_thumb
+
     img = Image.open(src_path).convert("RGB")
     img.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
     img.save(thumb_path, format="PNG", optimize=True)
@@ -197,6 +328,93 @@ def build_workbook():
 
     return wb, ws
 
+# =====================================================
+# HASIL PER GAMBAR -> BARIS EXCEL
+# =====================================================
+def write_result(ws, img_path: Path, probs, args, kwh_idx, neg_idx, src_dir: Path, thumb_dir: Path):
+    """Aturan status + tulis 1 baris Excel. Return 1 jika gambar dicopy (NEG kuat)."""
+    p_kwh = float(probs[kwh_idx])
+    p_neg = float(probs[neg_idx])
+
+    pred = "KWH" if p_kwh >= p_neg else "NEG"
+
+    # ===== status rules =====
+    # TRUE hanya kalau: pred=KWH dan confidence KWH >= kwh_threshold
+    # FALSE kalau:
+    # - pred=NEG (umumnya: pagar / tidak cocok / stand meter tidak terlihat)
+    # - keyword 'pagar' di nama file/folder
+    # - idpel/stand kurang 1 digit (opsional)
+    status = True
+    reasons = []
+
+    idpel, stand = extract_idpel_and_stand(img_path)
+
+    if pred == "NEG":
+        status = False
+        if p_neg >= args.neg_threshold:
+            reasons.append(f"NEG>={args.neg_threshold:.2f}")
+        else:
+            reasons.append("pred=NEG")
+
+    if pred == "KWH" and p_kwh < args.kwh_threshold:
+        status = False
+        reasons.append(f"KWH<{args.kwh_threshold:.2f}")
+
+    # FALSE ketika ada gambar pagar (berdasarkan keyword)
+    if "pagar" in img_path.name.lower() or "pagar" in str(img_path.parent).lower():
+        status = False
+        reasons.append("pagar")
+
+    # FALSE ketika idpel kurang 1 digit
+    if args.expected_idpel_len and idpel and len(idpel) == args.expected_idpel_len - 1:
+        status = False
+        reasons.append(f"idpel kurang 1 digit ({len(idpel)}/{args.expected_idpel_len})")
+
+    # FALSE ketika stand kurang 1 digit
+    if args.expected_stand_len and stand and len(stand) == args.expected_stand_len - 1:
+        status = False
+        reasons.append(f"stand kurang 1 digit ({len(stand)}/{args.expected_stand_len})")
+
+    reason_text = "; ".join(dict.fromkeys(reasons))  # unique, keep order
+
+    # ===== copy NEG kuat (sesuai script awal) =====
+    copied_to = ""
+    if pred == "NEG" and p_neg >= args.neg_threshold:
+        dst = Path(args.dst) / img_path.name
+        shutil.copy2(img_path, dst)
+        copied_to = str(dst)
+
+    # ===== write excel row =====
+    ws.append([
+        idpel,
+        stand,
+        img_path.name,
+        round(p_kwh, 4),
+        round(p_neg, 4),
+        pred,
+        "TRUE" if status else "FALSE",
+        reason_text,
+        "",  # image placeholder
+        copied_to,
+        str(img_path),
+    ])
+    row = ws.max_row
+
+    # cell alignment
+    for c in range(1, 12):
+        ws.cell(row=row, column=c).alignment = Alignment(vertical="top", wrap_text=True)
+
+    # embed thumbnail image
+    if args.embed_images:
+        derived_thumb = Path(args.thumbs) / img_path.relative_to(src_dir) if args.use_derived else None
+        thumb_path = make_thumbnail(img_path, thumb_dir, args.thumb_size, derived_thumb)
+        xl_img = XLImage(str(thumb_path))
+        xl_img.anchor = f"I{row}"  # column image
+        ws.add_image(xl_img)
+        ws.row_dimensions[row].height = 120
+
+    return 1 if copied_to else 0
+
 # =====================================================
 # MAIN
 # =====================================================
@@ -204,119 +422,65 @@ def main():
     args = parse_args()
 
     labels, kwh_idx, neg_idx = load_labels(args.labels)
-    itp, in_det, out_det, meta = load_interpreter(args.model)
+    itp, in_det, out_det, meta = load_interpreter(args.model, args.threads, max(1, args.batch))
     h, w, dtype = meta
+    batch_size = int(in_det["shape"][0])
 
     Path(args.dst).mkdir(parents=True, exist_ok=True)
     thumb_dir = Path(args.dst) / ".thumbs"
 
     wb, ws = build_workbook()
 
-    total = copied = 0
-
-    for img_path in Path(args.src).rglob("*"):
-        if img_path.suffix.lower() not in IMG_EXT:
+    total = copied = from_derived = inferred = 0
+    infer_time = 0.0
+    src_dir = Path(args.src)
+
+    images = (p for p in src_dir.rglob("*") if p.suffix.lower() in IMG_EXT)
+
+    if args.benchmark:
+        arrs = [load_model_array(p, (w, h)) for p in itertools.islice(images, args.bench_images)]
+        if not arrs:
+            print("[ERROR] Tidak ada gambar untuk benchmark")
+            return
+        run_benchmark(args, arrs, dtype)
+        return
+
+    for batch in iter_batches(images, batch_size):
+        # ===== load + preprocess 1 batch =====
+        paths, arrs = [], []
+        for img_path in batch:
+            try:
+                model_arr = load_derived(img_path, (w, h)) if args.use_derived else None
+                if model_arr is not None:
+                    from_derived += 1
+                else:
+                    model_arr = load_model_array(img_path, (w, h))
+                paths.append(img_path)
+                arrs.append(model_arr)
+            except Exception as e:
+                print(f"[ERROR] {img_path.name}: {e}")
+        if not arrs:
             continue
 
+        # ===== inference (1 invoke per batch) =====
+        t0 = time.perf_counter()
         try:
-            # ===== inference =====
-            inp = preprocess_image(img_path, (w, h), dtype)
-            itp.set_tensor(in_det["index"], inp)
-            itp.invoke()
-            raw = np.squeeze(itp.get_tensor(out_det["index"]))
-
-            # handle sigmoid / softmax output
-            if raw.ndim == 0:
-                probs = np.array([1 - raw, raw], dtype=np.float32)
-            else:
-                probs = softmax(raw.astype(np.float32))
-
-            p_kwh = float(probs[kwh_idx])
-            p_neg = float(probs[neg_idx])
-
-            pred = "KWH" if p_kwh >= p_neg else "NEG"
-
-            # ===== status rules =====
-            # TRUE hanya kalau: pred=KWH dan confidence KWH >= kwh_threshold
-            # FALSE kalau:
-            # - pred=NEG (umumnya: pagar / tidak cocok / stand meter tidak terlihat)
-            # - keyword 'pagar' di nama file/folder
-            # - idpel/stand kurang 1 digit (opsional)
-            status = True
-            reasons = []
-
-            idpel, stand = extract_idpel_and_stand(img_path)
-
-            if pred == "NEG":
-                status = False
-                if p_neg >= args.neg_threshold:
-                    reasons.append(f"NEG>={args.neg_threshold:.2f}")
-                else:
-                    reasons.append("pred=NEG")
-
-            if pred == "KWH" and p_kwh < args.kwh_threshold:
-                status = False
-                reasons.append(f"KWH<{args.kwh_threshold:.2f}")
-
-            # FALSE ketika ada gambar pagar (berdasarkan keyword)
-            if "pagar" in img_path.name.lower() or "pagar" in str(img_path.parent).lower():
-                status = False
-                reasons.append("pagar")
-
-            # FALSE ketika idpel kurang 1 digit
-            if args.expected_idpel_len and idpel and len(idpel) == args.expected_idpel_len - 1:
-                status = False
-                reasons.append(f"idpel kurang 1 digit ({len(idpel)}/{args.expected_idpel_len})")
-
-            # FALSE ketika stand kurang 1 digit
-            if args.expected_stand_len and stand and len(stand) == args.expected_stand_len - 1:
-                status = False
-                reasons.append(f"stand kurang 1 digit ({len(stand)}/{args.expected_stand_len})")
-
-            reason_text = "; ".join(dict.fromkeys(reasons))  # unique, keep order
-
-            # ===== copy NEG kuat (sesuai script awal) =====
-            copied_to = ""
-            if pred == "NEG" and p_neg >= args.neg_threshold:
-                dst = Path(args.dst) / img_path.name
-                shutil.copy2(img_path, dst)
-                copied_to = str(dst)
-                copied += 1
-
-            # ===== write excel row =====
-            ws.append([
-                idpel,
-                stand,
-                img_path.name,
-                round(p_kwh, 4),
-                round(p_neg, 4),
-                pred,
-                "TRUE" if status else "FALSE",
-                reason_text,
-                "",  # image placeholder
-                copied_to,
-                str(img_path),
-            ])
-            row = ws.max_row
-
-            # cell alignment
-            for c in range(1, 12):
-                ws.cell(row=row, column=c).alignment = Alignment(vertical="top", wrap_text=True)
-
-            # embed thumbnail image
-            if args.embed_images:
-                thumb_path = make_thumbnail(img_path, thumb_dir, args.thumb_size)
-                xl_img = XLImage(str(thumb_path))
-                xl_img.anchor = f"I{row}"  # column image
-                ws.add_image(xl_img)
-                ws.row_dimensions[row].height = 120
-
-            total += 1
-            if total % 25 == 0:
-                print(f"[INFO] {total} image diproses...")
-
+            probs_list = infer_batch(itp, in_det, out_det, arrs, dtype)
         except Exception as e:
-            print(f"[ERROR] {img_path.name}: {e}")
+            for img_path in paths:
+                print(f"[ERROR] {img_path.name}: {e}")
+            continue
+        infer_time += time.perf_counter() - t0
+        inferred += len(arrs)
+
+        for img_path, probs in zip(paths, probs_list):
+            try:
+                copied += write_result(ws, img_path, probs, args, kwh_idx, neg_idx, src_dir, thumb_dir)
+                total += 1
+                if total % 25 == 0:
+                    print(f"[INFO] {total} image diproses...")
+            except Exception as e:
+                print(f"[ERROR] {img_path.name}: {e}")
 
     # highlight rows with FALSE
     false_fill = PatternFill("solid", fgColor="F8D7DA")  # light red
@@ -331,6 +495,9 @@ def main():
     print("\n=== SELESAI ===")
     print(f"Total diproses : {total}")
     print(f"Dicopy (NEG)   : {copied}")
+    print(f"Dari turunan   : {from_derived}")
+    if infer_time > 0:
+        print(f"Inferensi      : {inferred / infer_time:.1f} gambar/dtk (batch {batch_size})")
     print(f"Log (xlsx)     : {args.log}")
 
 if __name__ == "__main__":